@@ -0,0 +1,165 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for walking directory trees).     https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from concurrent.futures import ProcessPoolExecutor, as_completed        # Pool of worker processes.         https://docs.python.org/3/library/concurrent.futures.html
+from compare_correlations import load_correlations, read_clusters, compute_errors, format_errors
+from selection import RunningTopK, best_of
+from sqs_index import load_index, read_blocks
+from sqs_structure import Structure, StructureError, poscar_text
+import poscar_output
+import timings
+
+# Scoring of many independent mcsqs runs (e.g. one per composition and cell size) at once. Every directory below the given paths
+# containing the files of a run (clusters.out, lat.in, tcorr_final.out, tcorr_finalRND.out and sqs.out) is scored by a pool of worker processes,
+# each one like compare_correlations.py. Every worker returns only the best num_best sqs of its run, which are merged into a global ranking:
+#
+#     [rank] [error] [directory] [number of the sqs within the sqs file of the directory, counted from 1]
+#
+# The sqs of the global ranking are then read from the sqs files (each file once, directly by means of its index) and exported together
+# to a single file (like best_sqs.out) and, with -p, as POSCAR files numbered by rank.
+
+RUN_FILES = ['clusters.out', 'lat.in', 'tcorr_final.out', 'tcorr_finalRND.out', 'sqs.out']
+
+def find_runs(paths, file_names=RUN_FILES):
+    # Sorted list of the directories below the given paths containing all of the given files.
+    runs = set()
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            if all(file_name in files for file_name in file_names):
+                runs.add(root)
+    return sorted(runs)
+
+def score_run(directory, damping, num_best, ties, use_cache, errors_file_name=None):
+    # Errors of all sqs of a single run. Returns (directory, number of sqs, errors and indices of the best num_best sqs) or (directory, error, None).
+    # Run by the worker processes.
+    try:
+        rcorr = load_correlations(os.path.join(directory, 'tcorr_finalRND.out'), use_cache)
+        scorr = load_correlations(os.path.join(directory, 'tcorr_final.out'), use_cache)
+        clusters = read_clusters(os.path.join(directory, 'clusters.out'), os.path.join(directory, 'lat.in'), use_cache)
+        errors = compute_errors(rcorr, scorr, clusters, [damping])
+    except (OSError, ValueError, IndexError) as err:
+        return directory, err, None
+    if errors_file_name is not None:
+        with open(os.path.join(directory, errors_file_name), 'w') as errors_file:
+            errors_file.write(format_errors(errors))
+    top_k = RunningTopK(num_best, ties)
+    top_k.add(errors[:, 0])
+    return directory, len(errors), top_k
+
+def merge(results, num_best, ties):
+    # Global ranking of the best sqs of all runs: (error, directory, index within the run) sorted by error, then by directory and index.
+    # The sqs of all runs are numbered consecutively (run after run, in the given order) for the selection.
+    errors = np.concatenate([np.empty(0)]+[top_k.errors for directory, top_k in results])
+    runs = np.concatenate([np.empty(0, dtype=np.int64)]+[np.full(len(top_k.indices), r, dtype=np.int64) for r, (directory, top_k) in enumerate(results)])
+    indices = np.concatenate([np.empty(0, dtype=np.int64)]+[top_k.indices for directory, top_k in results])
+    errors, order = best_of(errors, np.arange(len(errors)), num_best, ties)
+    return [(error, results[run][0], index) for error, run, index in zip(errors.tolist(), runs[order].tolist(), indices[order].tolist())]
+
+def read_ranked_blocks(ranking):
+    # The sqs of the ranking (as SQSBlock, in order of the ranking), every sqs file being indexed and read once.
+    blocks = [None]*len(ranking)
+    by_directory = {}
+    for rank, (error, directory, index) in enumerate(ranking):
+        by_directory.setdefault(directory, []).append((index, rank))
+    for directory, entries in by_directory.items():
+        sqs_file_name = os.path.join(directory, 'sqs.out')
+        sqs_index = load_index(sqs_file_name)
+        entries = sorted(entry for entry in entries if entry[0] < len(sqs_index))         # Read in order of the position within the file.
+        for (index, rank), block in zip(entries, read_blocks(sqs_file_name, sqs_index, [index for index, rank in entries])):
+            blocks[rank] = block
+    return blocks
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Score the sqs of many mcsqs runs in parallel, rank them together and export the best ones.')
+    parser.add_argument('paths', nargs='*', default=['.'],
+        help='Directories searched (recursively) for runs, i.e. directories containing {}. Defaults to the current directory.'.format(", ".join(RUN_FILES)))
+    parser.add_argument('-d', '--damp', dest='damping_constant', type=float, default=2.0,
+        help='Damping constant for weighting the impact of small and large clusters (see compare_correlations.py). Defaults to 2.')
+    parser.add_argument('-b', '--best', dest='num_best', type=int, default=10,
+        help='Number of best sqs of all runs to rank and export. Defaults to 10.')
+    parser.add_argument('-t', '--ties', dest='ties', action='store_true',
+        help='Additionally select all sqs with the same error as the last selected one.')
+    parser.add_argument('-r', '--ranking', dest='ranking_file', type=str, default='ranking.out',
+        help='Name of the file the global ranking is written to. Defaults to \'ranking.out\'.')
+    parser.add_argument('-o', dest='output_file', type=str, default='best_sqs_all.out',
+        help='Name of the file the best sqs of all runs are written to (in the format of sqs.out). Defaults to \'best_sqs_all.out\'.')
+    parser.add_argument('-e', '--errors', dest='errors_file', type=str, default=None,
+        help='Additionally write the errors of all sqs of every run to this file within the directory of the run (e.g. \'errors.out\').')
+    parser.add_argument('-p', '--poscar', dest='output_format', type=str, nargs='?', const='dir', choices=poscar_output.FORMATS, default=None,
+        help='Also convert the best sqs to POSCAR files numbered by rank (\'output_files/poscar_[rank]/POSCAR\', or an archive or stream as for atat_poscar.py -f).')
+    parser.add_argument('--order', nargs='*', dest='atom_list', default=['Li', 'Nb', 'Ta', 'O'],
+        help='Atom types in desired order for -p (as for atat_poscar.py -o). Defaults to \'Li Nb Ta O\'.')
+    parser.add_argument('--repr', dest='representation', type=str, choices=['car', 'cartesian', 'dir', 'direct'], default='cartesian',
+        help='Representation of the atom positions in the POSCAR files of -p. Defaults to cartesian.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=0,
+        help='Number of worker processes scoring the runs in parallel (0: one per CPU). Defaults to 0.')
+    parser.add_argument('-nc', '--no-cache', dest='use_cache', action='store_false',
+        help='Always parse the input files instead of reusing the arrays cached in \'.atat_cache\' of each run (see array_cache.py).')
+    timings.add_arguments(parser)
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    if args.num_best < 1:
+        print("\nThe number of best sqs (-b) has to be at least 1.")
+        sys.exit(-1)
+    with timer.stage('find runs') as stage:
+        runs = find_runs(args.paths)
+        stage.items = len(runs)
+    if not runs:
+        print("\nNo runs (directories containing {}) found within {}.\n".format(", ".join(RUN_FILES), " ".join(args.paths)))
+        sys.exit(-1)
+    print("\n{} runs found.\n".format(len(runs)))
+
+    # Every run is scored by a worker, the results are collected in the order of the runs (so the ranking does not depend on -j).
+    with timer.stage('score') as stage:
+        results = {}
+        jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+        with ProcessPoolExecutor(max_workers=min(jobs, len(runs))) as pool:
+            futures = [pool.submit(score_run, directory, args.damping_constant, args.num_best, args.ties, args.use_cache, args.errors_file) for directory in runs]
+            for future in as_completed(futures):
+                directory, num_sqs, top_k = future.result()
+                results[directory] = (num_sqs, top_k)
+                if top_k is None:
+                    print("    {:<40s} skipped: {}".format(directory, num_sqs))
+                else:
+                    print("    {:<40s} {:>8d} sqs, lowest error {}".format(directory, num_sqs, top_k.errors[0] if len(top_k.errors) else "-"))
+        stage.items = sum(num_sqs for num_sqs, top_k in results.values() if top_k is not None)
+
+    scored = [(directory, results[directory][1]) for directory in runs if results[directory][1] is not None]
+    ranking = merge(scored, args.num_best, args.ties)
+    with open(args.ranking_file, 'w') as ranking_file:
+        ranking_file.write("".join("{} {} {} {}\n".format(rank+1, error, directory, index+1) for rank, (error, directory, index) in enumerate(ranking)))
+    print("\nRanking of the best {} sqs of {} runs saved to \'{}\'.".format(len(ranking), len(scored), args.ranking_file))
+
+    with timer.stage('export') as stage:
+        blocks = read_ranked_blocks(ranking)
+        missing = [rank+1 for rank, block in enumerate(blocks) if block is None]
+        with open(args.output_file, 'w') as output_file:
+            output_file.write("".join(block.text for block in blocks if block is not None))
+        print("The best sqs have been saved to \'{}\'.".format(args.output_file))
+        if missing:
+            print("Not found in the sqs file of their run (ranks): {}".format(" ".join(str(rank) for rank in missing)))
+        if args.output_format is not None:
+            output_path = os.path.join(os.getcwd(), poscar_output.output_name("output_files", args.output_format))
+            messages = poscar_output.rotate(output_path)
+            if messages:
+                print("\n".join(messages))
+            output = poscar_output.open_output(output_path, args.output_format)
+            try:
+                for rank, ((error, directory, index), block) in enumerate(zip(ranking, blocks), 1):
+                    if block is not None:
+                        output.write(rank, poscar_text(Structure(block.lines, args.atom_list, index+1), directory, index+1, args.representation))
+            except StructureError as err:
+                print("\n{} (in {})".format(err, directory))
+                sys.exit(-1)
+            finally:
+                output.close()
+            print("POSCAR files of the best sqs saved to \'{}\'.".format(output_path))
+        stage.items = len(ranking)
+    print("")
+    timer.finish()
+
+if __name__ == "__main__":
+    main()
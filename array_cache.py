@@ -0,0 +1,92 @@
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import json             # JSON encoder and decoder (for the description of the cached files).               https://docs.python.org/3/library/json.html
+import hashlib          # Secure hashes (used to recognise changed source files).                           https://docs.python.org/3/library/hashlib.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+# Cache for arrays parsed from text files (e.g. the correlations of tcorr_final.out or the clusters of clusters.out).
+# The arrays are stored as .npy files within '.atat_cache' next to the (first) source file:
+#
+#     .atat_cache/[name of source file].[kind]/meta.json
+#     .atat_cache/[name of source file].[kind]/[name of array].npy
+#
+# meta.json records modification time, size and SHA-1 hash of every source file the arrays were parsed from.
+# The cached arrays are used (memory mapped, so loading takes no time) as long as modification time and size are unchanged,
+# or the hash is unchanged if only the modification time differs (e.g. after copying). Otherwise the source files are parsed again.
+
+CACHE_DIR = ".atat_cache"
+
+def file_hash(file_name):
+    sha1 = hashlib.sha1()
+    with open(file_name, 'rb') as input_file:
+        for data in iter(lambda: input_file.read(1 << 20), b''):
+            sha1.update(data)
+    return sha1.hexdigest()
+
+def file_key(file_name):
+    stat = os.stat(file_name)
+    return {'name': os.path.abspath(file_name), 'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+def entry_dir(file_names, kind):
+    return os.path.join(os.path.dirname(os.path.abspath(file_names[0])), CACHE_DIR, os.path.basename(file_names[0])+"."+kind)
+
+def is_valid(meta, file_names):
+    if len(meta['sources']) != len(file_names):
+        return False
+    for source, file_name in zip(meta['sources'], file_names):
+        key = file_key(file_name)
+        if key['name'] != source['name'] or key['size'] != source['size']:
+            return False
+        if key['mtime'] != source['mtime']:
+            if file_hash(file_name) != source['sha1']:
+                return False
+            source['mtime'] = key['mtime']      # Same content, only the modification time has changed.
+    return True
+
+def load(file_names, kind):
+    # Returns the cached arrays (memory mapped) for the given source files, or None if there are none or they are outdated.
+    directory = entry_dir(file_names, kind)
+    try:
+        with open(os.path.join(directory, "meta.json"), 'r') as meta_file:
+            meta = json.load(meta_file)
+        mtimes = [source['mtime'] for source in meta['sources']]
+        if not is_valid(meta, file_names):
+            return None
+        arrays = {name: np.load(os.path.join(directory, name+".npy"), mmap_mode='r') for name in meta['arrays']}
+        if mtimes != [source['mtime'] for source in meta['sources']]:
+            with open(os.path.join(directory, "meta.json"), 'w') as meta_file:
+                json.dump(meta, meta_file)
+        return arrays
+    except (OSError, ValueError, KeyError):
+        return None
+
+def source_keys(file_names):
+    # Modification time, size and hash of the source files (taken before parsing, so changes during parsing invalidate the entry).
+    sources = []
+    for file_name in file_names:
+        source = file_key(file_name)
+        source['sha1'] = file_hash(file_name)
+        sources.append(source)
+    return sources
+
+def save(file_names, kind, arrays, sources):
+    # Stores the arrays parsed from the given source files. meta.json is written last, so an interrupted write leaves no valid entry.
+    directory = entry_dir(file_names, kind)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if os.path.isfile(os.path.join(directory, "meta.json")):
+            os.remove(os.path.join(directory, "meta.json"))
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, name+".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(directory, "meta.json"), 'w') as meta_file:
+            json.dump({'sources': sources, 'arrays': list(arrays)}, meta_file)
+    except OSError:
+        pass                                    # E.g. no write permission, the arrays are then simply parsed again next time.
+
+def cached(file_names, kind, parse):
+    # Arrays parsed from the given source files by parse(*file_names) (a dictionary of arrays), taken from the cache if possible.
+    arrays = load(file_names, kind)
+    if arrays is None:
+        sources = source_keys(file_names)
+        arrays = parse(*file_names)
+        save(file_names, kind, arrays, sources)
+    return arrays
@@ -0,0 +1,122 @@
+#!/opt/local/bin/python
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import importlib        # The implementation of import (for importing the subcommands on demand).           https://docs.python.org/3/library/importlib.html
+
+# Single command line entry point of all scripts, e.g.
+#
+#     atat_vasp.py poscar -i best_sqs.out -f tar
+#     atat_vasp.py volume runs/*/CONTCAR
+#
+# Every subcommand is the main() of one of the scripts, which is imported only when the subcommand is run,
+# so lightweight subcommands (like volume, which does not need NumPy) start quickly. Link or copy the script as 'atat-vasp' to use it as a command.
+#
+# The same functions can be used from Python, without starting new processes:
+#
+#     import atat_vasp
+#     atat_vasp.run(['select', '-e', 'errors.out', '-b', '10'])          # Returns the exit code of the subcommand.
+#     structure = atat_vasp.Structure(lines, ['Li', 'Nb', 'Ta', 'O'])    # Imported from sqs_structure.py on first use.
+#
+# or chained in memory, without intermediate files (errors are raised as exceptions, e.g. StructureError, instead of exiting):
+#
+#     errors = atat_vasp.compute_errors(rcorr, scorr, atat_vasp.read_clusters('clusters.out', 'lat.in'), [2.0])
+#     selected = atat_vasp.select_sqs(errors, 10)[0]
+#     blocks = atat_vasp.read_blocks('sqs.out', atat_vasp.load_index('sqs.out'), selected)
+#     texts = [atat_vasp.poscar_text(atat_vasp.Structure(block.lines, atom_list, i+1), name, i+1, 'direct') for i, block in zip(selected, blocks)]
+
+COMMANDS = {                                    # Subcommand: (module, description)
+    'poscar':           ('atat_poscar',             'Convert SQS output files (e.g. best_sqs.out) to VASP POSCAR files.'),
+    'errors':           ('compare_correlations',    'Calculate the errors of the sqs from their correlations and select the best ones.'),
+    'select':           ('select_best',             'Select the best sqs given the errors and structures.'),
+    'concentration':    ('select_concentration',    'Select the sqs of given compositions.'),
+    'orth':             ('orth_cells',              'Find the (nearly) orthogonal supercells listed in sqscell.out.'),
+    'latconst':         ('get_lat_const',           'Determine the average lattice constant of relaxed cells (CONTCAR files).'),
+    'volume':           ('volume',                  'Print the volume of the cell of POSCAR/CONTCAR files.'),
+    'cells':            ('batch_cells',             'Calculate volume, lattice constants and angles of the cells of many CONTCAR/POSCAR files.'),
+    'watch':            ('watch_sqs',               'Score only the sqs appended by a running mcsqs job since the last run, keeping the best ones up to date.'),
+    'neighbors':        ('neighbors',               'Statistics of the distances between the atoms and radial distribution functions of CONTCAR/POSCAR files.'),
+    'aggregate':        ('aggregate_runs',          'Score the sqs of many mcsqs runs in parallel, rank them together and export the best ones.'),
+    'collect':          ('sqs_collection',          'Parse a SQS output file once and store all its SQS as a compact collection (.npz).'),
+}
+
+API = {                                         # Name: module, for the functions and classes available as attributes of this module.
+    'Structure':            'sqs_structure',
+    'StructureError':       'sqs_structure',
+    'poscar_text':          'sqs_structure',
+    'convert_sqs':          'atat_poscar',
+    'unique_blocks':        'atat_poscar',
+    'structure_fingerprint': 'duplicates',
+    'FingerprintIndex':     'duplicates',
+    'same_structure':       'duplicates',
+    'select_unique':        'select_best',
+    'select_unique_collection': 'select_best',
+    'SQSCollection':        'sqs_collection',
+    'convert_collection':   'sqs_collection',
+    'find_runs':            'aggregate_runs',
+    'score_run':            'aggregate_runs',
+    'read_sqs':             'sqs_reader',
+    'SQSBlock':             'sqs_reader',
+    'load_index':           'sqs_index',
+    'read_blocks':          'sqs_index',
+    'select_best':          'selection',
+    'select_from_file':     'selection',
+    'Condition':            'composition',
+    'split_blocks':         'composition',
+    'read_clusters':        'compare_correlations',
+    'load_correlations':    'compare_correlations',
+    'cluster_weights':      'compare_correlations',
+    'compute_errors':       'compare_correlations',
+    'select_sqs':           'compare_correlations',
+    'read_sqscells':        'orth_cells',
+    'gram_matrices':        'orth_cells',
+    'max_cosines':          'orth_cells',
+    'find_files':           'poscar_reader',
+    'read_cells':           'poscar_reader',
+    'read_structure':       'poscar_reader',
+    'neighbor_list':        'neighbors',
+    'radial_distribution':  'neighbors',
+    'pair_statistics':      'neighbors',
+    'coordination':         'neighbors',
+    'neighbors_of':         'neighbors',
+    'classify':             'get_lat_const',
+    'd_spacings':           'get_lat_const',
+    'cell_volume':          'volume',
+}
+
+def __getattr__(name):
+    # Called for attributes not defined here: imports the module of a function or class of API when it is first used.
+    if name not in API:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(API[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals())+list(API))
+
+def usage(prog):
+    lines = ["usage: {} <command> [options]".format(prog), "", "commands:"]
+    lines += ["    {:<16s}{}".format(command, description) for command, (module, description) in COMMANDS.items()]
+    lines += ["", "Run \'{} <command> -h\' for the options of a command.".format(prog)]
+    return "\n".join(lines)
+
+def run(argv, prog='atat-vasp'):
+    # Runs a subcommand within this process (argv like on the command line, without the program name), returns its exit code.
+    try:
+        main(argv, prog)
+    except SystemExit as exit:
+        return exit.code if isinstance(exit.code, int) else (0 if exit.code is None else 1)
+    return 0
+
+def main(argv=None, prog='atat-vasp'):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ['-h', '--help']:
+        print(usage(prog))
+        sys.exit(0 if argv else 2)
+    if argv[0] not in COMMANDS:
+        print("{}: unknown command \'{}\'.\n\n{}".format(prog, argv[0], usage(prog)))
+        sys.exit(2)
+    module, description = COMMANDS[argv[0]]
+    importlib.import_module(module).main(argv[1:], prog=prog+" "+argv[0])
+
+if __name__ == "__main__":
+    main()
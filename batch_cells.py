@@ -0,0 +1,71 @@
+#!/opt/local/bin/python
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+from poscar_reader import find_files, read_cells
+import timings
+
+# Volume, lattice constants and angles of the cells of many CONTCAR/POSCAR files in a single run
+# (instead of one run of get_volume_CONTCAR.py / get_lat_const_CONTCAR.py per file).
+
+COLUMNS = ['volume', 'a', 'b', 'c', 'alpha', 'beta', 'gamma', 'atoms']
+
+def cell_table(cells):
+    # Structured array with the file name and one field per column of COLUMNS for every cell.
+    table = np.zeros(len(cells), dtype=[('file', 'U{}'.format(max([len(file_name) for file_name in cells.file_names], default=1)))]
+        +[(column, int if column == 'atoms' else float) for column in COLUMNS])
+    table['file'] = cells.file_names
+    table['volume'] = cells.volumes()
+    lengths, angles = cells.lengths(), cells.angles()
+    for i, column in enumerate(['a', 'b', 'c']):
+        table[column] = lengths[:,i]
+    for i, column in enumerate(['alpha', 'beta', 'gamma']):
+        table[column] = angles[:,i]
+    table['atoms'] = cells.atom_numbers
+    return table
+
+def write_table(table, output_file_name):
+    # As .npy file (structured array) if the name ends with '.npy', as CSV file otherwise.
+    if output_file_name.endswith('.npy'):
+        np.save(output_file_name, table)
+        return
+    with open(output_file_name, 'w') as output_file:
+        output_file.write(",".join(['file']+COLUMNS)+"\n")
+        row_format = "{},"+",".join(["{:.8f}"]*7)+",{}\n"
+        output_file.write("".join(row_format.format(*row) for row in table.tolist()))
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Calculate volume, lattice constants and angles of the cells of many CONTCAR/POSCAR files.')
+    parser.add_argument('paths', nargs='*', default=['.'],
+        help='Files, directories (searched recursively) or glob patterns, e.g. \'runs/*/CONTCAR\' or \'runs/**/CONTCAR\'. Defaults to the current directory.')
+    parser.add_argument('-n', '--names', nargs='+', dest='names', default=['CONTCAR'], required=False,
+        help='Names of the files to look for within directories (glob patterns like \'POSCAR*\' allowed). Defaults to \'CONTCAR\'.')
+    parser.add_argument('-o', dest='output_file', type=str, default='cells.csv', required=False,
+        help='Name of output file, a CSV file or (if ending with \'.npy\') a NumPy file of a structured array. Defaults to \'cells.csv\'.')
+    parser.add_argument('-j', '--threads', dest='threads', type=int, default=8, required=False,
+        help='Number of threads reading the files. Defaults to 8.')
+    timings.add_arguments(parser)
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    with timer.stage('find files') as stage:
+        file_names = find_files(args.paths, args.names)
+        stage.items = len(file_names)
+    if not file_names:
+        print("\nNo files named {} found within {}.\n".format(" or ".join(args.names), " ".join(args.paths)))
+        sys.exit(-1)
+
+    with timer.stage('read') as stage:
+        cells, failed = read_cells(file_names, args.threads)
+        stage.items = len(file_names)
+    for file_name, err in failed:
+        print("Skipped {}: {}".format(file_name, err))
+    with timer.stage('calculate and write') as stage:
+        write_table(cell_table(cells), args.output_file)
+        stage.items = len(cells)
+
+    print("\nCells of {} of {} files saved to \'{}\'.\n".format(len(cells), len(file_names), args.output_file))
+    timer.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the loading).                        https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compare_correlations
+import synthetic
+
+# Loading the inputs of compare_correlations: parsing the text files against the cached, memory mapped arrays (see array_cache.py).
+
+def load_all(directory, use_cache):
+    start = time.perf_counter()
+    rcorr = compare_correlations.load_correlations(os.path.join(directory, "tcorr_finalRND.out"), use_cache)
+    scorr = compare_correlations.load_correlations(os.path.join(directory, "tcorr_final.out"), use_cache)
+    clusters = compare_correlations.read_clusters(os.path.join(directory, "clusters.out"), os.path.join(directory, "lat.in"), use_cache)
+    return time.perf_counter()-start
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare parsing the inputs of compare_correlations with loading them from the cache.')
+    parser.add_argument('-n', dest='num_sqs', type=int, default=200000, help='Number of sqs. Defaults to 2e5.')
+    parser.add_argument('-c', dest='num_clus', type=int, default=40, help='Number of clusters. Defaults to 40.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic.write_correlations(os.path.join(tmp_dir, "tcorr_finalRND.out"), args.num_sqs, args.num_clus, 1)
+        synthetic.write_correlations(os.path.join(tmp_dir, "tcorr_final.out"), args.num_sqs, args.num_clus, 2)
+        synthetic.write_clusters_out(os.path.join(tmp_dir, "clusters.out"), args.num_clus)
+        synthetic.write_lat_in(os.path.join(tmp_dir, "lat.in"))
+        print("{} sqs, {} clusters:".format(args.num_sqs, args.num_clus))
+        print("    {:<30s} {:10.4f} s".format('parsing (no cache)', load_all(tmp_dir, False)))
+        print("    {:<30s} {:10.4f} s".format('parsing + writing cache', load_all(tmp_dir, True)))
+        print("    {:<30s} {:10.4f} s".format('memory mapping cached arrays', load_all(tmp_dir, True)))
+
+if __name__ == "__main__":
+    main()
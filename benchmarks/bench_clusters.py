@@ -0,0 +1,70 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the loading).                        https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compare_correlations
+import synthetic
+
+# Loading and weighting the clusters of compare_correlations: the old Cluster (np.matrix per vertex, mean_distance as Python loop
+# over the vertex pairs on every call) against the packed vertex array with all pair distances computed in one pass at load time.
+
+class LegacyCluster:
+    def __init__(self, data, coordinate_system):
+        self.multiplicity = int(data[0])
+        self.longest_length = float(data[1])
+        self.num_atoms = int(data[2])
+        self.atoms = []
+        for i in range(self.num_atoms):
+            coords_org = np.transpose(np.matrix([float(val) for val in data[3+i].split()[:3]]))
+            coords_car = np.dot(np.transpose(coordinate_system), coords_org)
+            self.atoms.append(np.transpose(coords_car).tolist()[0])
+
+    def mean_distance(self):
+        diff_sum = 0
+        for i in range(self.num_atoms):
+            for j in range(i+1, self.num_atoms):
+                diff_sum += np.sqrt(sum([(self.atoms[i][xyz]-self.atoms[j][xyz])**2 for xyz in range(3)]))
+        return diff_sum*2/(self.num_atoms-1)/self.num_atoms
+
+def legacy_weights(clusters_file_name, structure_file_name, damping):
+    coordinate_system = np.matrix(compare_correlations.read_coordinate_system(structure_file_name))
+    clusters = []
+    data = []
+    for line in open(clusters_file_name, 'r').readlines():
+        if line != '\n':
+            data.append(line)
+        else:
+            clusters.append(LegacyCluster(data, coordinate_system))
+            data = []
+    return np.array([0]+[cluster.multiplicity/(cluster.num_atoms*cluster.mean_distance())**damping for cluster in clusters[1:]])
+
+def new_weights(clusters_file_name, structure_file_name, damping, use_cache=False):
+    return compare_correlations.cluster_weights(compare_correlations.read_clusters(clusters_file_name, structure_file_name, use_cache), damping)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old and new loading and weighting of clusters.')
+    parser.add_argument('-c', dest='num_clus', type=int, default=20000, help='Number of clusters. Defaults to 2e4.')
+    parser.add_argument('-p', dest='max_points', type=int, default=5, help='Maximum number of vertices per cluster. Defaults to 5 (quintuplets).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clusters_file_name = synthetic.write_clusters_out(os.path.join(tmp_dir, "clusters.out"), args.num_clus, args.max_points)
+        structure_file_name = synthetic.write_lat_in(os.path.join(tmp_dir, "lat.in"))
+        print("{} clusters with up to {} vertices:".format(args.num_clus, args.max_points))
+        results = []
+        for label, weights in [('np.matrix per vertex, loop', legacy_weights), ('packed vertices, one pass', new_weights),
+                ('packed vertices, cached', lambda *files: new_weights(*files, use_cache=True))]:
+            if label.endswith('cached'):
+                new_weights(clusters_file_name, structure_file_name, 2.0, True)     # Fills the cache.
+            start = time.perf_counter()
+            results.append(weights(clusters_file_name, structure_file_name, 2.0))
+            print("    {:<30s} {:8.3f} s".format(label, time.perf_counter()-start))
+        print("    Maximum deviation: {:.2e}".format(np.max(np.abs(results[0]-results[1]))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the selection).                      https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import subprocess       # Subprocess management (for running select_concentration.py).                      https://docs.python.org/3/library/subprocess.html
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+
+# select_concentration: the old script (whole file read with readlines(), line.count('Nb') and line.count('Ta') on every line,
+# one pass per composition) against the streaming filter (atom types parsed once per line, all compositions in a single pass).
+# Use -s to set the size of the synthetic sqs.out, e.g. -s 4000 for a file of about 4 GB.
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "select_concentration.py")
+
+def legacy_select(file_name, output_file_name, num_nb, num_ta):
+    input_file = [line.rstrip() for line in open(file_name, 'r').readlines()]
+    output_file = open(output_file_name, 'w')
+    structure = []
+    nb_count = 0
+    ta_count = 0
+    for line in input_file:
+        nb_count += line.count('Nb')
+        ta_count += line.count('Ta')
+        structure.append(line)
+        if line == '':
+            if nb_count == num_nb and ta_count == num_ta:
+                for content in structure:
+                    output_file.write(content+"\n")
+            structure = []
+            nb_count = 0
+            ta_count = 0
+    output_file.close()
+
+def run_script(arguments):
+    subprocess.run([sys.executable, SCRIPT]+arguments, check=True, stdout=subprocess.DEVNULL)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old and new selection of sqs by composition.')
+    parser.add_argument('-s', dest='size_mb', type=float, default=200, help='Approximate size of the synthetic sqs.out in MB. Defaults to 200.')
+    parser.add_argument('-a', dest='num_atoms', type=int, default=120, help='Number of atoms per structure. Defaults to 120.')
+    parser.add_argument('-b', dest='num_buckets', type=int, default=3, help='Number of compositions to select. Defaults to 3.')
+    parser.add_argument('-d', dest='directory', type=str, default=None, help='Directory to write to. Defaults to a temporary directory.')
+    args = parser.parse_args()
+
+    num_sqs = max(1, int(args.size_mb*1e6/(31*args.num_atoms+120)))
+    num_site = args.num_atoms//5
+    compositions = [(num_nb, num_site-num_nb) for num_nb in range(num_site//2, num_site//2+args.num_buckets)]
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp_dir:
+        file_name = synthetic.write_sqs_out(os.path.join(tmp_dir, "sqs.out"), num_sqs, args.num_atoms, vary=True)
+        print("Input: {} structures, {:.1f} MB, {} compositions".format(num_sqs, os.path.getsize(file_name)/1e6, len(compositions)))
+
+        start = time.perf_counter()
+        for num_nb, num_ta in compositions:
+            legacy_select(file_name, os.path.join(tmp_dir, "legacy.out"), num_nb, num_ta)
+        legacy_time = time.perf_counter()-start
+        print("    {:<40s} {:8.3f} s".format('readlines + line.count, one pass each', legacy_time))
+
+        start = time.perf_counter()
+        for num_nb, num_ta in compositions:
+            run_script(['-i', file_name, '-o', os.path.join(tmp_dir, "single.out"), '-Nb', str(num_nb), '-Ta', str(num_ta)])
+        single_time = time.perf_counter()-start
+        print("    {:<40s} {:8.3f} s ({:.1f}x)".format('streaming filter, one pass each', single_time, legacy_time/single_time))
+
+        where = sum([['-w', "Nb={},Ta={}".format(num_nb, num_ta)] for num_nb, num_ta in compositions], [])
+        start = time.perf_counter()
+        run_script(['-i', file_name, '-o', os.path.join(tmp_dir, "multi.out")]+where)
+        multi_time = time.perf_counter()-start
+        print("    {:<40s} {:8.3f} s ({:.1f}x)".format('streaming filter, single pass', multi_time, legacy_time/multi_time))
+
+if __name__ == "__main__":
+    main()
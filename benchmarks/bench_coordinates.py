@@ -0,0 +1,60 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the conversions).                    https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import atat_poscar
+import synthetic
+
+# Benchmark of the coordinate transformations in atat_poscar.Structure:
+# the old per-atom np.matrix transformations (inverse of the lattice computed once per atom) against the batched (N,3) version.
+
+def legacy_convert(data):
+    # The conversion as it was done before, one np.matrix per atom.
+    coordinate_system = np.matrix([values for vectors in data[0:3] for values in vectors.split()], dtype=float).reshape((3, 3))
+    lattice_vectors_org = np.matrix([values for vectors in data[3:6] for values in vectors.split()], dtype=float).reshape((3, 3))
+    lattice_vectors_car = lattice_vectors_org*coordinate_system
+    coords_dir = []
+    for line in data[6:-1]:
+        coords_org = np.transpose(np.matrix([float(val) for val in line.split()[:-1]]))
+        coords_car = np.dot(np.transpose(coordinate_system), coords_org)
+        coords_dir.append(np.dot(np.linalg.inv(np.transpose(lattice_vectors_car)), coords_car))
+    return coords_dir
+
+def batched_convert(data):
+    return atat_poscar.Structure(data, None).coords_dir()
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old and new coordinate transformations of atat_poscar.')
+    parser.add_argument('-n', dest='num_sqs', type=int, default=1000, help='Number of synthetic structures. Defaults to 1000.')
+    parser.add_argument('-a', dest='num_atoms', type=int, default=120, help='Number of atoms per structure. Defaults to 120.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = synthetic.write_sqs_out(os.path.join(tmp_dir, "sqs.out"), args.num_sqs, args.num_atoms)
+        content = [line.rstrip() for line in open(file_name, 'r').readlines()]
+    blocks = []
+    data = []
+    for line in content:
+        if line == '':
+            continue
+        data.append(line)
+        if line == 'end':
+            blocks.append(data)
+            data = []
+
+    results = {}
+    for label, convert in [('per-atom np.matrix', legacy_convert), ('batched ndarray', batched_convert)]:
+        start = time.perf_counter()
+        for data in blocks:
+            convert(data)
+        results[label] = time.perf_counter()-start
+        print("{:<20s} {:10.4f} s  ({:.1f} structures/s)".format(label, results[label], len(blocks)/results[label]))
+    print("Speedup: {:.1f}x".format(results['per-atom np.matrix']/results['batched ndarray']))
+
+if __name__ == "__main__":
+    main()
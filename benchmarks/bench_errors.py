@@ -0,0 +1,53 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the calculation).                    https://docs.python.org/3/library/time.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compare_correlations
+
+# Error function of compare_correlations: the old per-sqs generator over the clusters (calling mean_distance for every pair)
+# against the weight vector and a single matrix-vector product.
+
+def make_clusters(num_clus, seed=0):
+    rng = np.random.default_rng(seed)
+    clusters = []
+    for j in range(num_clus):
+        num_points = 1 if j == 0 else 2+j % 3
+        clusters.append(compare_correlations.Cluster(int(rng.integers(1, 13)), 5.0, rng.random((num_points, 3))*[5.1616, 5.1616, 13.9018]))
+    return clusters
+
+def legacy_errors(rcorr, scorr, clusters, damping):
+    return [sum([clusters[j].multiplicity/(clusters[j].num_atoms*clusters[j].mean_distance())**damping*abs(scorr[i,j]-rcorr[i,j]) for j in range(1, len(clusters))]) for i in range(len(rcorr))]
+
+def new_errors(rcorr, scorr, clusters, damping):
+    return compare_correlations.calc_errors(rcorr, scorr, compare_correlations.cluster_weights(clusters, damping))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old and new calculation of the error functions.')
+    parser.add_argument('-n', dest='num_sqs', type=int, default=1000000, help='Number of sqs for the new calculation. Defaults to 1e6.')
+    parser.add_argument('-l', dest='num_legacy', type=int, default=2000, help='Number of sqs for the old calculation (extrapolated to -n). Defaults to 2000.')
+    parser.add_argument('-c', dest='num_clus', type=int, default=40, help='Number of clusters. Defaults to 40.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    clusters = make_clusters(args.num_clus)
+    rcorr = rng.random((args.num_sqs, args.num_clus))
+    scorr = rng.random((args.num_sqs, args.num_clus))
+
+    start = time.perf_counter()
+    legacy = legacy_errors(np.matrix(rcorr[:args.num_legacy]), np.matrix(scorr[:args.num_legacy]), clusters, 2.0)
+    legacy_time = (time.perf_counter()-start)*args.num_sqs/args.num_legacy
+    start = time.perf_counter()
+    new = new_errors(rcorr, scorr, clusters, 2.0)
+    new_time = time.perf_counter()-start
+
+    print("{} sqs, {} clusters:".format(args.num_sqs, args.num_clus))
+    print("    {:<34s} {:10.3f} s (extrapolated from {} sqs)".format('generator + mean_distance per sqs', legacy_time, args.num_legacy))
+    print("    {:<34s} {:10.3f} s ({:.0f}x)".format('weight vector + matrix product', new_time, legacy_time/new_time))
+    print("    Maximum deviation: {:.2e}".format(np.max(np.abs(np.array(legacy)-new[:args.num_legacy]))))
+
+if __name__ == "__main__":
+    main()
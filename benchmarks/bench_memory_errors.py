@@ -0,0 +1,62 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the calculation).                    https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import tracemalloc      # Trace memory allocations (for measuring the peak memory).                         https://docs.python.org/3/library/tracemalloc.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compare_correlations
+from selection import RunningTopK
+import synthetic
+
+# Peak memory of loading tcorr_final.out / tcorr_finalRND.out and computing the errors:
+# the old string list + reshape, reading the whole files with np.loadtxt, and reading both files in chunks with a running top-k.
+
+def legacy_load(rcorr_file_name, scorr_file_name, weights, num_best):
+    matrices = []
+    for file_name in [rcorr_file_name, scorr_file_name]:
+        lines = open(file_name, 'r').readlines()
+        matrices.append(np.matrix([values for line in lines for values in line.split()], dtype=float).reshape((len(lines), len(lines[0].split()))))
+    errors = np.asarray(np.abs(matrices[1]-matrices[0]) @ weights).ravel()
+    return np.argsort(errors)[:num_best]
+
+def full_load(rcorr_file_name, scorr_file_name, weights, num_best):
+    errors = compare_correlations.calc_errors(compare_correlations.read_correlations(rcorr_file_name), compare_correlations.read_correlations(scorr_file_name), weights)
+    return np.argsort(errors)[:num_best]
+
+def chunked_load(rcorr_file_name, scorr_file_name, weights, num_best, chunk_size=10000):
+    top_k = RunningTopK(num_best)
+    for rcorr, scorr in compare_correlations.correlation_chunks(rcorr_file_name, scorr_file_name, chunk_size):
+        top_k.add(compare_correlations.calc_errors(rcorr, scorr, weights))
+    return top_k.result()
+
+def profile(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter()-start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the peak memory of the correlation loading in compare_correlations.')
+    parser.add_argument('-n', dest='sizes', nargs='+', type=int, default=[10000, 100000, 300000], help='Numbers of sqs. Defaults to 1e4, 1e5 and 3e5.')
+    parser.add_argument('-c', dest='num_clus', type=int, default=40, help='Number of clusters. Defaults to 40.')
+    args = parser.parse_args()
+
+    weights = np.random.default_rng(0).random(args.num_clus)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            rcorr_file_name = synthetic.write_correlations(os.path.join(tmp_dir, "tcorr_finalRND.out"), size, args.num_clus, 1)
+            scorr_file_name = synthetic.write_correlations(os.path.join(tmp_dir, "tcorr_final.out"), size, args.num_clus, 2)
+            print("{} sqs, {} clusters (final data {:.1f} MB per file):".format(size, args.num_clus, size*args.num_clus*8/1e6))
+            for label, function in [('string list + reshape', legacy_load), ('np.loadtxt, whole files', full_load), ('chunks of 10000 + top-k', chunked_load)]:
+                elapsed, peak = profile(function, rcorr_file_name, scorr_file_name, weights, 100)
+                print("    {:<26s} peak {:9.1f} MB {:9.3f} s".format(label, peak/1e6, elapsed))
+
+if __name__ == "__main__":
+    main()
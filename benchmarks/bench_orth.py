@@ -0,0 +1,54 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the screening).                      https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import orth_cells
+import synthetic
+
+# Screening of sqscell.out for orthogonal cells: the old loop (np.matrix and three dot products per cell)
+# against a single parse into an (M,3,3) array and batched Gram matrices.
+
+def legacy_orth(lattice_file_name, sqscell_file_name, tol=1e-8):
+    lattice_file = [line.rstrip() for line in open(lattice_file_name, 'r').readlines()]
+    coordinate_system = np.matrix([values for vectors in lattice_file[:3] for values in vectors.split()], dtype=float).reshape((3, 3))
+    sqscell_file = [line.rstrip() for line in open(sqscell_file_name, 'r').readlines()]
+    num_sqscells = int(sqscell_file.pop(0))
+    found = []
+    for i in range(num_sqscells):
+        lattice_vectors_org = np.matrix([values for vectors in sqscell_file[4*i+1:4*i+4] for values in vectors.split()], dtype=float).reshape((3, 3))
+        lattice_vectors_car = lattice_vectors_org*coordinate_system
+        a = lattice_vectors_car[0].reshape((3,1))
+        b = lattice_vectors_car[1].reshape((3,1))
+        c = lattice_vectors_car[2].reshape((3,1))
+        if abs(np.transpose(a)*b)<tol and abs(np.transpose(b)*c)<tol and abs(np.transpose(c)*a)<tol:
+            found.append(i)
+    return found
+
+def new_orth(lattice_file_name, sqscell_file_name, tol=1e-8):
+    lattice_vectors_org, lines = orth_cells.read_sqscells(sqscell_file_name)
+    gram = orth_cells.gram_matrices(lattice_vectors_org, orth_cells.read_coordinate_system(lattice_file_name))
+    return np.flatnonzero(np.all(np.abs(orth_cells.off_diagonal(gram)) < tol, axis=1)).tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old and new screening of sqscell.out.')
+    parser.add_argument('-n', dest='num_cells', type=int, default=100000, help='Number of synthetic cells. Defaults to 1e5.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lattice_file_name = synthetic.write_lat_in(os.path.join(tmp_dir, "lat.in"))
+        sqscell_file_name = synthetic.write_sqscell_out(os.path.join(tmp_dir, "sqscell.out"), args.num_cells)
+        print("{} cells:".format(args.num_cells))
+        results = []
+        for label, screen in [('np.matrix loop', legacy_orth), ('(M,3,3) array + Gram matrices', new_orth)]:
+            start = time.perf_counter()
+            results.append(screen(lattice_file_name, sqscell_file_name))
+            print("    {:<32s} {:8.3f} s  ({} orthogonal)".format(label, time.perf_counter()-start, len(results[-1])))
+        print("    Same cells found: {}".format(results[0] == results[1]))
+
+if __name__ == "__main__":
+    main()
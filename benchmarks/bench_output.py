@@ -0,0 +1,50 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the output).                         https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import atat_poscar
+import poscar_output
+from sqs_reader import read_sqs
+import synthetic
+
+# Output backends of atat_poscar: time for writing all POSCAR files and for deleting them again (as done when rotating old results),
+# and the number of file system entries created (each of them costs at least one metadata operation for creation and one for deletion).
+
+def count_entries(path):
+    if not os.path.isdir(path):
+        return 1+os.path.isfile(path+".idx")
+    return 1+sum(len(dirs)+len(files) for root, dirs, files in os.walk(path))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the output backends of atat_poscar.')
+    parser.add_argument('-n', dest='num_sqs', type=int, default=10000, help='Number of synthetic structures. Defaults to 10000.')
+    parser.add_argument('-a', dest='num_atoms', type=int, default=40, help='Number of atoms per structure. Defaults to 40.')
+    parser.add_argument('-d', dest='directory', type=str, default=None, help='Directory to write to (e.g. on the parallel file system). Defaults to a temporary directory.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp_dir:
+        file_name = synthetic.write_sqs_out(os.path.join(tmp_dir, "sqs.out"), args.num_sqs, args.num_atoms)
+        print("{} structures with {} atoms:".format(args.num_sqs, args.num_atoms))
+        print("    {:<8s} {:>12s} {:>10s} {:>10s} {:>10s}".format('format', 'fs entries', 'write [s]', 'delete [s]', 'size [MB]'))
+        for output_format in poscar_output.FORMATS:
+            path = os.path.join(tmp_dir, poscar_output.output_name("output_files", output_format))
+            start = time.perf_counter()
+            output = poscar_output.open_output(path, output_format)
+            for count in atat_poscar.convert_sqs(enumerate(read_sqs(file_name), 1), ['Li', 'Nb', 'Ta', 'O'], "Benchmark", 'cartesian', output):
+                pass
+            output.close()
+            write_time = time.perf_counter()-start
+            entries = count_entries(path)
+            size = sum(os.path.getsize(os.path.join(root, name)) for root, dirs, files in os.walk(path) for name in files) if os.path.isdir(path) else os.path.getsize(path)
+            start = time.perf_counter()
+            poscar_output.remove(path)
+            poscar_output.remove(path+".idx")
+            delete_time = time.perf_counter()-start
+            print("    {:<8s} {:>12d} {:>10.3f} {:>10.3f} {:>10.1f}".format(output_format, entries, write_time, delete_time, size/1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the conversion).                     https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import atat_poscar
+import poscar_output
+from sqs_reader import read_sqs
+import synthetic
+
+# Conversion of SQS to POSCAR files by atat_poscar with different numbers of worker processes.
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the POSCAR conversion of atat_poscar for different numbers of worker processes.')
+    parser.add_argument('-n', dest='num_sqs', type=int, default=10000, help='Number of synthetic structures. Defaults to 10000.')
+    parser.add_argument('-a', dest='num_atoms', type=int, default=120, help='Number of atoms per structure. Defaults to 120.')
+    parser.add_argument('-j', dest='jobs', nargs='+', type=int, default=[1, 4, 16], help='Numbers of worker processes. Defaults to 1, 4 and 16.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = synthetic.write_sqs_out(os.path.join(tmp_dir, "sqs.out"), args.num_sqs, args.num_atoms)
+        print("{} structures with {} atoms ({} CPUs available):".format(args.num_sqs, args.num_atoms, os.cpu_count()))
+        reference = None
+        for jobs in args.jobs:
+            output_dir = os.path.join(tmp_dir, "output_files_{}".format(jobs))
+            output = poscar_output.open_output(output_dir, 'dir')
+            start = time.perf_counter()
+            for count in atat_poscar.convert_sqs(enumerate(read_sqs(file_name), 1), ['Li', 'Nb', 'Ta', 'O'], "Benchmark", 'cartesian', output, jobs):
+                pass
+            output.close()
+            elapsed = time.perf_counter()-start
+            print("    {:>3d} worker(s) {:10.3f} s  ({:.0f} POSCAR/s)".format(jobs, elapsed, count/elapsed))
+            # The output has to be the same for every number of workers.
+            last = open(os.path.join(output_dir, "poscar_{}".format(count), "POSCAR"), 'r').read()
+            if reference is not None and last != reference:
+                print("    Warning: output differs from the one of {} worker(s).".format(args.jobs[0]))
+            reference = reference or last
+
+if __name__ == "__main__":
+    main()
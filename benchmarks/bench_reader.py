@@ -0,0 +1,47 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the reading).                        https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqs_reader import read_sqs
+import synthetic
+
+# Throughput (MB/s) of the streaming SQS reader compared to reading the whole file with readlines() and splitting it afterwards.
+
+def readlines_split(file_name):
+    sqs_list = []
+    single_sqs = []
+    for line in [line.rstrip() for line in open(file_name, 'r').readlines()]:
+        single_sqs.append(line)
+        if line == '':
+            sqs_list.append(single_sqs)
+            single_sqs = []
+    return len(sqs_list)
+
+def streaming(file_name):
+    count = 0
+    for block in read_sqs(file_name):
+        count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the throughput of the streaming SQS reader.')
+    parser.add_argument('-n', dest='num_sqs', type=int, default=10000, help='Number of synthetic structures. Defaults to 10000.')
+    parser.add_argument('-a', dest='num_atoms', type=int, default=120, help='Number of atoms per structure. Defaults to 120.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = synthetic.write_sqs_out(os.path.join(tmp_dir, "sqs.out"), args.num_sqs, args.num_atoms)
+        size_mb = os.path.getsize(file_name)/1e6
+        print("Input: {} structures, {:.1f} MB".format(args.num_sqs, size_mb))
+        for label, reader in [('readlines + split', readlines_split), ('read_sqs (streaming)', streaming)]:
+            start = time.perf_counter()
+            count = reader(file_name)
+            elapsed = time.perf_counter()-start
+            print("{:<22s} {:8.3f} s  {:8.1f} MB/s  ({} structures)".format(label, elapsed, size_mb/elapsed, count))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the selection).                      https://docs.python.org/3/library/time.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from selection import select_best, select_from_file
+import synthetic
+
+# Selection of the best sqs: the old min/pop loop against the argpartition based selection (in memory and streamed from errors.out).
+
+def legacy_select(error_list, num_best):
+    error_list = list(error_list)
+    remaining = list(range(len(error_list)))
+    selected = []
+    for i in range(num_best):
+        index = error_list.index(min(error_list))
+        error_list.pop(index)
+        selected.append(remaining.pop(index))
+    return selected
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter()-start, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old and new selection of the best sqs.')
+    parser.add_argument('-n', dest='sizes', nargs='+', type=int, default=[100000, 1000000], help='Numbers of candidates. Defaults to 1e5 and 1e6.')
+    parser.add_argument('-b', dest='num_best', type=int, default=100, help='Number of sqs to select. Defaults to 100.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            file_name = synthetic.write_errors(os.path.join(tmp_dir, "errors.out"), size)
+            errors = np.loadtxt(file_name)
+            error_list = errors.tolist()
+            print("{} candidates, {} best:".format(size, args.num_best))
+            legacy_time, legacy = timed(legacy_select, error_list, args.num_best)
+            print("    {:<28s} {:10.4f} s".format('min/pop loop (in memory)', legacy_time))
+            new_time, new = timed(select_best, errors, args.num_best)
+            print("    {:<28s} {:10.4f} s  ({:.0f}x)".format('argpartition (in memory)', new_time, legacy_time/new_time))
+            stream_time, stream = timed(select_from_file, file_name, args.num_best)
+            print("    {:<28s} {:10.4f} s  (including parsing)".format('streamed from errors.out', stream_time))
+            if legacy != new.tolist() or legacy != stream.tolist():
+                print("    Warning: selections differ.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (used for timing the scripts).                        https://docs.python.org/3/library/time.html
+import json             # JSON encoder and decoder (for the results).                                       https://docs.python.org/3/library/json.html
+import runpy            # Locating and executing Python modules (for running a script within the child).    https://docs.python.org/3/library/runpy.html
+import platform         # Access to underlying platform's identifying data.                                 https://docs.python.org/3/library/platform.html
+import resource         # Resource usage information (for the peak memory of the child).                    https://docs.python.org/3/library/resource.html
+import tempfile         # Generate temporary files and directories.                                         https://docs.python.org/3/library/tempfile.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import subprocess       # Subprocess management (every benchmark runs in a fresh process).                  https://docs.python.org/3/library/subprocess.html
+import contextlib       # Utilities for with-statement contexts (for silencing the scripts).                https://docs.python.org/3/library/contextlib.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import poscar_output
+import synthetic
+
+# Benchmark suite of the command line scripts: synthetic input files of a size given by -s are generated into a temporary directory,
+# then every script runs (-r times) in a fresh Python process with these files. Wall time of the process (wall_s, including the start of Python)
+# and of the script alone (script_s), number of processed items per second and peak memory (maximum resident set size) are recorded in a JSON file:
+#
+#     {"environment": {"python": ..., "numpy": ..., "platform": ..., "commit": ..., "date": ..., "scale": ...},
+#      "benchmarks": {"[name]": {"script": ..., "arguments": [...], "items": ..., "wall_s": ..., "script_s": ..., "items_per_s": ..., "peak_rss_mb": ...}, ...}}
+#
+# With -c the results are compared to those of an earlier run (e.g. of the previous version), slowdowns beyond -t are marked.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def sizes(scale):
+    return {'num_sqs': max(1, int(2000*scale)), 'num_atoms': 120, 'num_clus': 40, 'num_cells': max(1, int(20000*scale)), 'num_contcars': max(1, int(500*scale))}
+
+def generate(directory, size):
+    # All input files used by the benchmarks.
+    synthetic.write_lat_in(os.path.join(directory, "lat.in"))
+    synthetic.write_clusters_out(os.path.join(directory, "clusters.out"), size['num_clus'])
+    synthetic.write_correlations(os.path.join(directory, "tcorr_finalRND.out"), size['num_sqs'], size['num_clus'], 1)
+    synthetic.write_correlations(os.path.join(directory, "tcorr_final.out"), size['num_sqs'], size['num_clus'], 2)
+    synthetic.write_sqs_out(os.path.join(directory, "sqs.out"), size['num_sqs'], size['num_atoms'], vary=True)
+    synthetic.write_errors(os.path.join(directory, "errors.out"), size['num_sqs'])
+    synthetic.write_sqscell_out(os.path.join(directory, "sqscell.out"), size['num_cells'])
+    synthetic.write_contcar_tree(os.path.join(directory, "contcars"), size['num_contcars'], size['num_atoms'])
+
+def benchmarks(size):
+    # (name, script, arguments, number of items processed, files and directories to delete before every run)
+    num_site = size['num_atoms']//5
+    where = "Nb={},Ta={}".format(num_site//2, num_site-num_site//2)
+    return [
+        ('compare_correlations', 'compare_correlations.py', ['-nc', '-o', 'errors_cc.out', '-b', '10'], size['num_sqs'], ['sqs.out.idx']),
+        ('compare_correlations_chunked', 'compare_correlations.py', ['-nc', '-o', 'errors_cc.out', '-b', '10', '-ch', '1000'], size['num_sqs'], ['sqs.out.idx']),
+        ('compare_correlations_damping', 'compare_correlations.py', ['-nc', '-o', 'errors_cc.out', '-d', '1:5:0.5'], size['num_sqs'], []),
+        ('select_best', 'select_best.py', ['-e', 'errors.out', '-s', 'sqs.out', '-b', '100', '-o', 'best_sel.out'], size['num_sqs'], ['sqs.out.idx']),
+        ('select_concentration', 'select_concentration.py', ['-i', 'sqs.out', '-o', 'conc.out', '-w', where, '-w', "Nb=0:{}".format(num_site//4)], size['num_sqs'], []),
+        ('atat_poscar_dir', 'atat_poscar.py', ['-i', 'sqs.out'], size['num_sqs'], ['output_files', 'output_files~']),
+        ('atat_poscar_stream', 'atat_poscar.py', ['-i', 'sqs.out', '-f', 'stream'], size['num_sqs'], ['output_files.poscar', 'output_files.poscar.idx']),
+        ('orth_cells', 'orth_cells.py', ['-c', '0.3', '-r'], size['num_cells'], []),
+        ('get_lat_const', 'get_lat_const.py', ['-i', 'contcars'], size['num_contcars'], []),
+        ('batch_cells', 'batch_cells.py', ['contcars', '-o', 'cells.csv'], size['num_contcars'], []),
+    ]
+
+def child(result_file_name, script, arguments):
+    # Runs a single script within this (fresh) process and writes its wall time and peak memory to the result file.
+    sys.argv = [script]+arguments
+    sys.path.insert(0, REPO_DIR)
+    exit_code = 0
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            runpy.run_path(os.path.join(REPO_DIR, script), run_name='__main__')
+        except SystemExit as exit:
+            exit_code = exit.code if isinstance(exit.code, int) else 1
+    elapsed = time.perf_counter()-start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak/1e6 if sys.platform == 'darwin' else peak/1e3              # Bytes on macOS, kilobytes elsewhere.
+    with open(result_file_name, 'w') as result_file:
+        json.dump({'wall_s': elapsed, 'peak_rss_mb': peak_mb, 'exit_code': exit_code}, result_file)
+
+def run(directory, name, script, arguments, num_items, cleanup, repeat):
+    # Best (shortest) of repeat runs and the largest peak memory of them.
+    results = []
+    for i in range(repeat):
+        for path in cleanup:
+            poscar_output.remove(os.path.join(directory, path))
+        result_file_name = os.path.join(directory, name+".json")
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--child', result_file_name, script]+arguments, cwd=directory, check=True)
+        with open(result_file_name, 'r') as result_file:
+            results.append(json.load(result_file))
+        results[-1]['process_s'] = time.perf_counter()-started
+    wall = min(result['process_s'] for result in results)
+    return {'script': script, 'arguments': arguments, 'items': num_items, 'wall_s': wall, 'script_s': min(result['wall_s'] for result in results), 'items_per_s': num_items/wall,
+            'peak_rss_mb': max(result['peak_rss_mb'] for result in results), 'exit_code': max(result['exit_code'] for result in results)}
+
+def environment(scale):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'commit': commit, 'date': time.strftime("%Y-%m-%dT%H:%M:%S"), 'scale': scale}
+
+def compare(results, previous, threshold):
+    # Prints the ratio of the wall times (new/old) of all benchmarks found in both runs, returns the names of the slower ones.
+    slower = []
+    print("\nCompared to {} (commit {}):".format(previous['environment'].get('date'), previous['environment'].get('commit')))
+    for name, result in results['benchmarks'].items():
+        if name not in previous['benchmarks']:
+            continue
+        ratio = result['wall_s']/previous['benchmarks'][name]['wall_s']
+        mark = "  <-- slower" if ratio > threshold else ""
+        if mark:
+            slower.append(name)
+        print("    {:<30s} {:8.3f} s -> {:8.3f} s  ({:5.2f}x){}".format(name, previous['benchmarks'][name]['wall_s'], result['wall_s'], ratio, mark))
+    return slower
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3], sys.argv[4:])
+        return
+
+    parser = argparse.ArgumentParser(description='Run the benchmark suite of all scripts and record the results as JSON.')
+    parser.add_argument('-s', dest='scale', type=float, default=1.0, help='Size of the synthetic inputs (1: 2000 sqs, 20000 cells in sqscell.out, 500 CONTCAR files). Defaults to 1.')
+    parser.add_argument('-r', dest='repeat', type=int, default=3, help='Number of runs of every benchmark (the shortest one counts). Defaults to 3.')
+    parser.add_argument('-b', dest='names', nargs='+', default=None, help='Names of the benchmarks to run. Defaults to all of them.')
+    parser.add_argument('-o', dest='output_file', type=str, default='benchmark_results.json', help='Name of the output file. Defaults to \'benchmark_results.json\'.')
+    parser.add_argument('-c', dest='compare_file', type=str, default=None, help='Results of an earlier run to compare with.')
+    parser.add_argument('-t', dest='threshold', type=float, default=1.2, help='Ratio of wall times (new/old) above which a benchmark counts as slower. Defaults to 1.2.')
+    parser.add_argument('-d', dest='directory', type=str, default=None, help='Directory for the input files (e.g. on the parallel file system). Defaults to a temporary directory.')
+    args = parser.parse_args()
+
+    size = sizes(args.scale)
+    results = {'environment': environment(args.scale), 'benchmarks': {}}
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp_dir:
+        start = time.perf_counter()
+        generate(tmp_dir, size)
+        print("Input files generated in {:.1f} s ({}).".format(time.perf_counter()-start, ", ".join("{}={}".format(key, val) for key, val in size.items())))
+        print("    {:<30s} {:>10s} {:>12s} {:>10s}".format('benchmark', 'wall [s]', 'items/s', 'RSS [MB]'))
+        for name, script, arguments, num_items, cleanup in benchmarks(size):
+            if args.names is not None and name not in args.names:
+                continue
+            result = run(tmp_dir, name, script, arguments, num_items, cleanup, args.repeat)
+            results['benchmarks'][name] = result
+            print("    {:<30s} {:>10.3f} {:>12.0f} {:>10.1f}{}".format(name, result['wall_s'], result['items_per_s'], result['peak_rss_mb'],
+                "" if result['exit_code'] == 0 else "  (exit code {})".format(result['exit_code'])))
+
+    with open(args.output_file, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print("\nResults saved to \'{}\'.".format(args.output_file))
+
+    if args.compare_file is not None:
+        with open(args.compare_file, 'r') as compare_file:
+            slower = compare(results, json.load(compare_file), args.threshold)
+        if slower:
+            print("\nSlower than before: {}".format(", ".join(slower)))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
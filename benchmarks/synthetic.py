@@ -0,0 +1,108 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+# Generators for synthetic ATAT input files, used by the benchmarks in this directory.
+# All generators are seeded, so the same arguments always produce the same files.
+
+# Hexagonal coordinate system of LiNbO3 (rows are the basis vectors, as in lat.in).
+COORDINATE_SYSTEM = [[5.1616, 0.0, 0.0], [-2.5808, 4.470071, 0.0], [0.0, 0.0, 13.9018]]
+
+def write_sqs_out(file_name, num_sqs, num_atoms=120, species=('Li', 'Nb', 'Ta', 'O'), seed=0, vary=False):
+    # Writes num_sqs structures in the mcsqs multi-structure format (each one terminated by 'end' and a blank line).
+    # With vary=True the split of the second site between the second and third species is random (different compositions, at least one atom each).
+    rng = np.random.default_rng(seed)
+    counts = [num_atoms//5, num_atoms//10, num_atoms//5-num_atoms//10]
+    counts.append(num_atoms-sum(counts))
+    header = "".join(" ".join("{:.6f}".format(val) for val in row)+"\n" for row in COORDINATE_SYSTEM)
+    header += "2 0 0\n0 2 0\n0 0 1\n"
+    with open(file_name, 'w') as output_file:
+        for i in range(num_sqs):
+            coords = rng.random((num_atoms, 3))*[2, 2, 1]
+            if vary:
+                counts[1] = int(rng.integers(1, num_atoms//5))
+                counts[2] = num_atoms//5-counts[1]
+            names = np.repeat(np.array(species), counts)
+            rng.shuffle(names)
+            output_file.write(header)
+            output_file.write("".join("{:.6f} {:.6f} {:.6f} {}\n".format(x, y, z, s) for (x, y, z), s in zip(coords, names)))
+            output_file.write("end\n\n")
+    return file_name
+
+def write_lat_in(file_name):
+    # Coordinate system, unit cell and sites of a LiNbO3-like lattice (only the first three lines are used by the scripts).
+    with open(file_name, 'w') as output_file:
+        output_file.write("".join(" ".join("{:.6f}".format(val) for val in row)+"\n" for row in COORDINATE_SYSTEM))
+        output_file.write("1 0 0\n0 1 0\n0 0 1\n")
+        output_file.write("0.000000 0.000000 0.000000 Li\n0.000000 0.000000 0.500000 Nb,Ta\n0.250000 0.333333 0.250000 O\n")
+    return file_name
+
+def write_clusters_out(file_name, num_clus, max_points=4, seed=0):
+    # Writes num_clus clusters in the corrdump format, the first one being the point cluster.
+    # The other clusters have between 2 and max_points vertices.
+    rng = np.random.default_rng(seed)
+    with open(file_name, 'w') as output_file:
+        for i in range(num_clus):
+            num_points = 1 if i == 0 else 2+i % (max_points-1)
+            points = rng.random((num_points, 3))*2 if num_points > 1 else np.zeros((1, 3))
+            output_file.write("{}\n{:.6f}\n{}\n".format(int(rng.integers(1, 13)), float(rng.random()*10), num_points))
+            output_file.write("".join("{:.6f} {:.6f} {:.6f} 1 0\n".format(*point) for point in points))
+            output_file.write("\n")
+    return file_name
+
+def write_correlations(file_name, num_sqs, num_clus, seed=0):
+    # Writes num_sqs lines of num_clus correlations each (like tcorr_final.out or tcorr_finalRND.out).
+    rng = np.random.default_rng(seed)
+    with open(file_name, 'w') as output_file:
+        for start in range(0, num_sqs, 10000):
+            block = rng.random((min(10000, num_sqs-start), num_clus))*2-1
+            output_file.write("".join(" ".join("{:.6f}".format(val) for val in row)+"\n" for row in block.tolist()))
+    return file_name
+
+def write_errors(file_name, num_sqs, seed=0):
+    # Writes num_sqs random errors, one per line (like errors.out).
+    rng = np.random.default_rng(seed)
+    with open(file_name, 'w') as output_file:
+        output_file.write("".join("{!r}\n".format(val) for val in rng.random(num_sqs).tolist()))
+    return file_name
+
+def write_sqscell_out(file_name, num_cells, max_entry=3, seed=0):
+    # Writes num_cells random non-singular supercells (integer multiples of the lattice vectors of lat.in) in the format of sqscell.out.
+    rng = np.random.default_rng(seed)
+    cells = []
+    while len(cells) < num_cells:
+        cell = rng.integers(-max_entry, max_entry+1, (3, 3))
+        if round(abs(np.linalg.det(cell))) >= 1:
+            cells.append(cell)
+    with open(file_name, 'w') as output_file:
+        output_file.write("{}\n".format(num_cells))
+        output_file.write("".join("\n"+"".join("{} {} {}\n".format(*row) for row in cell.tolist()) for cell in cells))
+    return file_name
+
+# Lattice vectors (rows) of the three Li(NbTa)O3 reference cells recognised by get_lat_const.py.
+REFERENCE_CELLS = {
+    'long': [[5.1616, 0.0, 0.0], [2.5808, 8.9401, 0.0], [0.0, 0.0, 27.8036]],
+    'medium': [[5.1616, 0.0, 0.0], [0.0, 13.9018, 0.0], [2.5808, 0.0, 17.8802]],
+    'short': [[8.9401, 0.0, 0.0], [-5.1616, 8.9401, 0.0], [0.0, 0.0, 13.9018]],
+}
+
+def write_contcar_tree(directory, num_cells, num_atoms=120, seed=0):
+    # Writes num_cells CONTCAR files to [directory]/run_[n]/CONTCAR, cycling through the reference cells,
+    # each one slightly distorted (relaxed) and with a random split of the Nb/Ta sites. Returns the list of file names.
+    rng = np.random.default_rng(seed)
+    names = sorted(REFERENCE_CELLS)
+    file_names = []
+    num_site = num_atoms//5
+    for i in range(num_cells):
+        lattice = np.array(REFERENCE_CELLS[names[i % len(names)]])*(1+rng.normal(0, 0.005, (3, 3)))
+        num_ta = int(rng.integers(0, num_site+1))
+        counts = [num_site, num_site-num_ta, num_ta, num_atoms-2*num_site]
+        run_dir = os.path.join(directory, "run_{}".format(i))
+        os.makedirs(run_dir, exist_ok=True)
+        file_names.append(os.path.join(run_dir, "CONTCAR"))
+        with open(file_names[-1], 'w') as output_file:
+            output_file.write("Relaxed structure {}\n   1.00000000000000\n".format(i))
+            output_file.write("".join("  {:20.16f}{:20.16f}{:20.16f}\n".format(*row) for row in lattice.tolist()))
+            output_file.write("   Li   Nb   Ta   O\n"+"".join("{:6d}".format(num) for num in counts)+"\nDirect\n")
+            output_file.write("".join("  {:.16f}  {:.16f}  {:.16f}\n".format(*row) for row in rng.random((num_atoms, 3)).tolist()))
+    return file_names
@@ -1,71 +1,267 @@
 #!/opt/local/bin/python
 import sys                  # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import itertools            # Functions creating iterators for efficient looping (for reading in chunks).       https://docs.python.org/3/library/itertools.html
 import numpy as np          # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
 import argparse             # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+from sqs_index import load_index, read_blocks
+from selection import select_best, num_selected, count_lines, RunningTopK
+import array_cache
+import timings
 
 class Cluster:
-    def __init__(self, data, coordinate_system):
-        self.multiplicity = int(data[0])
-        self.longest_length = float(data[1])
-        self.num_atoms = int(data[2])
-
-        self.atoms = []
-        for i in range(self.num_atoms):
-            coords_org = np.transpose(np.matrix([float(val) for val in data[3+i].split()[:3]]))
-            coords_car = np.dot(np.transpose(coordinate_system), coords_org)
-            self.atoms.append(np.transpose(coords_car).tolist()[0])
-    
+    def __init__(self, multiplicity, longest_length, atoms, mean_distance=None, max_distance=None):
+        self.multiplicity = multiplicity
+        self.longest_length = longest_length
+        self.num_atoms = len(atoms)
+        self.atoms = atoms                      # Cartesian coordinates of the vertices, one row per vertex.
+        if mean_distance is None:
+            mean_distance, max_distance = [float(val[0]) for val in pair_distances(np.array([0, len(atoms)]), np.asarray(atoms, dtype=float).reshape((-1, 3)))]
+        self.mean_distance_value = mean_distance            # Mean distance between the vertices (nan for a single vertex), computed once.
+        self.max_distance = max_distance                    # Longest distance between two vertices (nan for a single vertex).
+
     def mean_distance(self):
         if self.num_atoms == 1:
             return None
+        return self.mean_distance_value
+
+def pair_distances(offsets, coords):
+    # Mean and longest distance between the vertices of every cluster (nan for clusters with a single vertex), all clusters at once.
+    # The vertices of cluster j are coords[offsets[j]:offsets[j+1]]. Clusters of the same size are stacked into a (k,n,3) array,
+    # so there is one vectorized pass over all vertex pairs per cluster size. The mean is the sum of the n(n-1)/2 pair distances times 2/(n-1)/n.
+    num_atoms = np.diff(offsets)
+    mean_distance = np.full(len(num_atoms), np.nan)
+    max_distance = np.full(len(num_atoms), np.nan)
+    for n in np.unique(num_atoms[num_atoms > 1]).tolist():
+        clusters = np.flatnonzero(num_atoms == n)
+        vertices = coords[offsets[clusters][:,None]+np.arange(n)]                          # (k,n,3)
+        first, second = np.triu_indices(n, 1)
+        distances = np.sqrt(np.sum((vertices[:,first]-vertices[:,second])**2, axis=2))     # (k,n(n-1)/2)
+        mean_distance[clusters] = np.sum(distances, axis=1)*2/(n-1)/n
+        max_distance[clusters] = np.max(distances, axis=1)
+    return mean_distance, max_distance
+
+def read_coordinate_system(structure_file_name):
+    # The first three lines of the structure file (e.g. lat.in) describe the coordinate system, the vectors make up the rows of the matrix.
+    lines = open(structure_file_name, 'r').readlines()
+    return np.array([vectors.split()[:3] for vectors in lines[:3]], dtype=float)
+
+def parse_clusters(clusters_file_name, structure_file_name):
+    # Parses the clusters file into arrays: multiplicity, longest pair length and number of vertices of each cluster,
+    # the cartesian coordinates of all vertices of all clusters one after another (coords) and the index of the first vertex of each cluster (offsets).
+    coordinate_system = read_coordinate_system(structure_file_name)
+    # Every cluster is terminated by a blank line (text after the last blank line is ignored).
+    blocks = [block.split('\n') for block in open(clusters_file_name, 'r').read().split('\n\n')[:-1]]
+    multiplicity = [int(block[0]) for block in blocks]
+    longest_length = [float(block[1]) for block in blocks]
+    num_atoms = [int(block[2]) for block in blocks]
+    vertices = [vertex for block, num in zip(blocks, num_atoms) for vertex in block[3:3+num]]
+    # All vertex lines are split at once if they have the same number of columns (as written by corrdump), one by one otherwise.
+    values = " ".join(vertices).split()
+    num_columns = len(vertices[0].split()) if vertices else 3
+    if len(values) == num_columns*len(vertices):
+        coords_org = np.array(values, dtype=float).reshape((-1, num_columns))[:,:3]
+    else:
+        coords_org = np.array([vertex.split()[:3] for vertex in vertices], dtype=float).reshape((-1, 3))
+    coords = coords_org @ coordinate_system
+    offsets = np.concatenate(([0], np.cumsum(num_atoms))).astype(np.int64)
+    mean_distance, max_distance = pair_distances(offsets, coords)
+    return {'coordinate_system': coordinate_system, 'multiplicity': np.array(multiplicity, dtype=np.int64), 'longest_length': np.array(longest_length),
+            'num_atoms': np.array(num_atoms, dtype=np.int64), 'offsets': offsets, 'coords': coords, 'mean_distance': mean_distance, 'max_distance': max_distance}
+
+class Clusters:
+    # All clusters of a clusters file, packed into arrays (see parse_clusters): the vertices of cluster j are coords[offsets[j]:offsets[j+1]].
+    # Single clusters are created on access only (clusters[j]), the weights are calculated from the arrays directly.
+    def __init__(self, arrays):
+        self.multiplicity = np.asarray(arrays['multiplicity'])
+        self.longest_length = np.asarray(arrays['longest_length'])
+        self.num_atoms = np.asarray(arrays['num_atoms'])
+        self.offsets = np.asarray(arrays['offsets'])
+        self.coords = np.asarray(arrays['coords'])
+        if 'mean_distance' in arrays:
+            self.mean_distance, self.max_distance = np.asarray(arrays['mean_distance']), np.asarray(arrays['max_distance'])
         else:
-            diff_sum = 0
-            for i in range(self.num_atoms):
-                for j in range(i+1, self.num_atoms):
-                    diff_sum += np.sqrt(sum([(self.atoms[i][xyz]-self.atoms[j][xyz])**2 for xyz in range(3)]))
-            return diff_sum*2/(self.num_atoms-1)/self.num_atoms     # Comprehend why the factor is indeed N!
+            self.mean_distance, self.max_distance = pair_distances(self.offsets, self.coords)  # Cached before the distances were stored.
 
-def print_errors(output_file_name, rcorr, scorr, clusters):
-    output_file = open(output_file_name, 'w')
-    error_list = []
+    def __len__(self):
+        return len(self.multiplicity)
+
+    def __getitem__(self, j):
+        return Cluster(int(self.multiplicity[j]), float(self.longest_length[j]), self.coords[self.offsets[j]:self.offsets[j+1]],
+            float(self.mean_distance[j]), float(self.max_distance[j]))
+
+    def __iter__(self):
+        return (self[j] for j in range(len(self)))
+
+def clusters_from_arrays(arrays):
+    return Clusters(arrays)
+
+def read_clusters(clusters_file_name, structure_file_name, use_cache=False):
+    # List of the clusters of the clusters file, their vertices are converted to cartesian coordinates using the coordinate system of the structure file.
+    if use_cache:
+        return clusters_from_arrays(array_cache.cached([clusters_file_name, structure_file_name], "clusters", parse_clusters))
+    return clusters_from_arrays(parse_clusters(clusters_file_name, structure_file_name))
+
+def cluster_weights(clusters, damping):
+    # Weight of each cluster in the error function: multiplicity/(number of vertices*mean distance of the vertices)**damping.
+    # The first cluster (index 0) is excluded (weight 0), because it contains only one vertex. A correlation function for a single atom is not of interest.
+    # For an array of damping constants, the result has one column per damping constant.
+    # The mean distances are precomputed (see pair_distances), so this is a single vectorized expression over all clusters.
+    damping = np.asarray(damping, dtype=float)
+    # A list of single clusters is accepted as well.
+    if isinstance(clusters, Clusters):
+        multiplicity, num_atoms, mean_distance = clusters.multiplicity, clusters.num_atoms, clusters.mean_distance
+    else:
+        multiplicity, num_atoms, mean_distance = [np.array([getattr(cluster, name) for cluster in clusters]) for name in ['multiplicity', 'num_atoms', 'mean_distance_value']]
+    shape = (-1,)+(1,)*damping.ndim
+    weights = np.zeros((len(clusters),)+damping.shape)
+    weights[1:] = multiplicity[1:].astype(float).reshape(shape)/(num_atoms[1:]*mean_distance[1:]).reshape(shape)**damping
+    return weights
+
+def calc_errors(rcorr, scorr, weights):
+    # Error function of all sqs at once: weighted sum over the absolute differences of the correlations (one row per sqs).
+    return np.abs(scorr-rcorr) @ weights
+
+def read_correlations(correlation_file, max_rows=None):
+    # Correlations of all sqs in a file (or of the next max_rows sqs of an opened file), one row per sqs and one column per cluster.
+    if max_rows is None:
+        return np.loadtxt(correlation_file, ndmin=2)
+    lines = [line for line in itertools.islice(correlation_file, max_rows) if line.strip() != '']
+    if not lines:
+        return np.empty((0, 0))
+    return np.loadtxt(lines, ndmin=2)
+
+def parse_correlations(correlation_file_name):
+    return {'correlations': read_correlations(correlation_file_name)}
+
+def load_correlations(correlation_file_name, use_cache=False):
+    # Correlations of all sqs, taken from the cache (memory mapped) if use_cache is set and the file has not changed since it was cached.
+    if use_cache:
+        return array_cache.cached([correlation_file_name], "correlations", parse_correlations)['correlations']
+    return read_correlations(correlation_file_name)
+
+def correlation_chunks(rcorr_file_name, scorr_file_name, chunk_size):
+    # Generator yielding the random and sqs correlations of (at most) chunk_size sqs at a time.
+    # Both files are read simultaneously, so only a single chunk of each is held in memory.
+    with open(rcorr_file_name, 'r') as rcorr_file, open(scorr_file_name, 'r') as scorr_file:
+        while True:
+            rcorr = read_correlations(rcorr_file, chunk_size)
+            scorr = read_correlations(scorr_file, chunk_size)
+            if rcorr.shape != scorr.shape:
+                raise ValueError("The correlation files contain different numbers of sqs or clusters.")
+            if len(rcorr) == 0:
+                return
+            yield rcorr, scorr
+
+PROGRESS_ROWS = 100000  # Number of sqs whose errors are computed between two updates of the live count.
+
+def print_count(count, num_backspace):
+    # Live count of the processed sqs, returns the number of characters to delete for the next update.
+    sys.stdout.write("\b"*num_backspace+"%s" %count)
+    sys.stdout.flush()
+    return int(np.floor(np.log10(max(count, 1)))+1)
+
+def format_errors(errors):
+    # One line per sqs, one column per damping constant.
+    return "".join(" ".join(str(error) for error in row)+"\n" for row in errors.tolist())
+
+def compute_errors(rcorr, scorr, clusters, damping, progress=None):
+    # Errors of all sqs for all damping constants, one row per sqs and one column per damping constant.
+    # The weights of all damping constants are stacked as columns, so all errors result from a single matrix product.
+    # With progress, the product is taken PROGRESS_ROWS sqs at a time and progress(number of sqs done) is called after each part.
+    if rcorr.shape != scorr.shape:
+        raise ValueError("The correlations contain different numbers of sqs or clusters ({} and {}).".format(rcorr.shape, scorr.shape))
+    weights = cluster_weights(clusters, np.array(damping, dtype=float))
+    if progress is None:
+        return calc_errors(rcorr, scorr, weights)
+    errors = np.empty((len(rcorr),)+weights.shape[1:])
+    for start in range(0, len(rcorr), PROGRESS_ROWS):
+        errors[start:start+PROGRESS_ROWS] = calc_errors(rcorr[start:start+PROGRESS_ROWS], scorr[start:start+PROGRESS_ROWS], weights)
+        progress(min(start+PROGRESS_ROWS, len(rcorr)))
+    return errors
+
+def print_errors(output_file_name, rcorr, scorr, clusters, damping):
+    # Live count of the processed sqs, updated after every PROGRESS_ROWS sqs (files with fewer sqs are done in a single product).
     num_backspace = 0
-    for i in range(num_sqs):
-        if i > 0:
-            num_backspace = int(np.floor(np.log10(i))+1)
-        sys.stdout.write("\b"*num_backspace+"%s" %(i+1))
-        sys.stdout.flush()
-
-        error = sum([clusters[j].multiplicity/(clusters[j].num_atoms*clusters[j].mean_distance())**damping*abs(scorr[i,j]-rcorr[i,j]) for j in range(1, num_clus)]) # The first cluster (index 0) is excluded, because it contains only one vertex. A correlation function for a single atom is not of interest.
-        error_list.append(error)
-        output_file.write(str(error)+"\n")
+    def progress(count):
+        nonlocal num_backspace
+        num_backspace = print_count(count, num_backspace)
+    error_list = compute_errors(rcorr, scorr, clusters, damping, progress)
+
+    output_file = open(output_file_name, 'w')
+    output_file.write(format_errors(error_list))
+    output_file.close()
     print(" error functions corresponding to the input sqs where saved to \'"+output_file_name+"\'.\n")
     return error_list
 
-def select_sqs(num_best, error_list):
-    content = [line.rstrip() for line in open(args.sqs_file, 'r').readlines()]
-    sqs_list = []
-    single_sqs = []
-    for line in content:
-        single_sqs.append(line)
-        if line == '':
-            sqs_list.append(single_sqs)
-            single_sqs = []
-
-    output_file = open("best_sqs.out", 'w')
-    for i in range(num_best):
-        index = error_list.index(min(error_list))
-        error_list.pop(index)
-        sqs_temp = sqs_list.pop(index)
-        for line in sqs_temp:
+def print_errors_chunked(output_file_name, rcorr_file_name, scorr_file_name, clusters, damping, chunk_size, top_k):
+    # Like print_errors, but the correlation files are processed chunk by chunk. Instead of returning all errors,
+    # the best ones for each damping constant are collected in top_k (if given), so the memory needed does not depend on the number of sqs.
+    weights = cluster_weights(clusters, np.array(damping, dtype=float))
+    output_file = open(output_file_name, 'w')
+    count = 0
+    num_backspace = 0
+    for rcorr, scorr in correlation_chunks(rcorr_file_name, scorr_file_name, chunk_size):
+        errors = calc_errors(rcorr, scorr, weights)
+        output_file.write(format_errors(errors))
+        if top_k is not None:
+            for d in range(len(damping)):
+                top_k[d].add(errors[:, d])
+        count += len(errors)
+        num_backspace = print_count(count, num_backspace)
+    output_file.close()
+    print(" error functions corresponding to the input sqs where saved to \'"+output_file_name+"\'.\n")
+
+def best_sqs_file_name(d, damping):
+    # Output file of the best sqs for the damping constant with index d ('best_sqs.out' if there is only one).
+    if len(damping) == 1:
+        return "best_sqs.out"
+    return "best_sqs_damp{:g}.out".format(damping[d])
+
+def select_sqs(error_list, num_best, ties=False, keep_order=False):
+    # Indices of the best sqs for each damping constant (column of error_list).
+    return [select_best(error_list[:, d], num_best, ties, keep_order) for d in range(error_list.shape[1])]
+
+def write_best_sqs(sqs_file_name, selected, output_file_name="best_sqs.out"):
+    # The selected sqs are read directly from their position in the sqs file (see sqs_index.py).
+    sqs_index = load_index(sqs_file_name)
+    output_file = open(output_file_name, 'w')
+    for block in read_blocks(sqs_file_name, sqs_index, selected):
+        for line in block.lines:
             output_file.write(line+"\n")
+        output_file.write("\n")
     output_file.close()
 
-    print("The best {} sqs have been saved to \'best_sqs.out\'.\n".format(num_best))
+    print("The best {} sqs have been saved to \'{}\'.\n".format(len(selected), output_file_name))
+
+def print_overlap(selections, damping):
+    # Number of sqs selected for both of two damping constants, for all pairs of damping constants.
+    if len(selections) < 2:
+        return
+    print("Number of sqs selected for both damping constants:")
+    print("        "+"".join("{:>8g}".format(value) for value in damping))
+    for d in range(len(selections)):
+        print("{:>8g}".format(damping[d])+"".join("{:>8d}".format(len(np.intersect1d(selections[d], other))) for other in selections))
+    print("")
 
 def make_bin_chart(error_list):
     plt.bar(error_list)
     plt.savefig()
 
+def damping_values(x):
+    # A single damping constant, a comma separated list (e.g. 1,2,3) or a range start:stop:step including stop (e.g. 1:5:0.5).
+    try:
+        if ':' in x:
+            values = [float(val) for val in x.split(':')]
+            start, stop, step = values if len(values) == 3 else values+[1.0]
+            if step <= 0 or stop < start:
+                raise ValueError
+            values = [start+i*step for i in range(int(np.floor((stop-start)/step+1e-9))+1)]
+        else:
+            values = [float(val) for val in x.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is no valid damping constant, list or range. Check -h for explanation of usage."%(x,))
+    return values
+
 def restricted_float(x):
     if float(x) < 0.0:
         raise argparse.ArgumentTypeError("%r smaller than zero. Check -h for explanation of usage."%(x,))
@@ -74,8 +270,8 @@ def restricted_float(x):
 # p = argparse.ArgumentParser()
 # p.add_argument("--arg", type=restricted_float)
 
-def main():
-    parser = argparse.ArgumentParser(description='Calculate error function.')
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Calculate error function.')
 
     parser.add_argument('-r', '--rcorr', dest='random_correlation_file', type=str, default='tcorr_finalRND.out',
         help='Name of file containing random correlations. Defaults to \'tcorr_finalRND.out\' if omitted.')
@@ -85,78 +281,79 @@ def main():
         help='Name of file containing clusters. Defaults to \'clusters.out\' if omitted.')
     parser.add_argument('-st', '--struc', dest='structure_file', type=str, default='lat.in',
         help='Name of the structure file. First three lines need to contain the coordinate system used by the calculations. Used for calculation of the cartesian atom positions. defaults to \'lat.in\'.')
-    parser.add_argument('-d', '--damp', dest='damping_constant', type=float, default=2.0,
-        help='Damping constant for weighting the impact of small and large clusters. Choose between 1 and 5. The higher, the less big clusters are taken into account. Defaults to 2.')
+    parser.add_argument('-d', '--damp', dest='damping_constant', type=damping_values, default=[2.0],
+        help='Damping constant for weighting the impact of small and large clusters. Choose between 1 and 5. The higher, the less big clusters are taken into account. Defaults to 2. '
+        +'Several values (e.g. 1,2,3) or a range (e.g. 1:5:0.5) can be given, the errors for all of them are then written as columns of the output file (one line per sqs, one column per damping constant in the order given, '
+        +'select by one of them with select_best.py -c) and the best sqs (-b) are selected for each of them.')
     parser.add_argument('-o', '--ofile', dest='output_file_name', type=str, default="errors.out",
         help='Name of output file to write the errors to. Defaults to \'errors.out\'.')
     parser.add_argument('-b', '--best', dest='num_best', type=restricted_float, default=0.,
         help='If this value is given as positive float, the best sqs get written to \'best_sqs.out\'. For num_best < 1 the best 100*num_best %% of sqs are chosen, for num_best >= 1 the round(num_best) best sqs get selected.')
     parser.add_argument('-sq', '--sqs', dest='sqs_file', type=str, default='sqs.out',
         help='File to take sqs from when using -b option. Defaults to \'sqs.out\'.')
+    parser.add_argument('-t', '--ties', dest='ties', action='store_true',
+        help='When using -b option, additionally select all sqs with the same error as the last selected one.')
+    parser.add_argument('-k', '--keep-order', dest='keep_order', action='store_true',
+        help='When using -b option, write the selected sqs in the order they appear in the sqs file instead of sorted by error.')
+    parser.add_argument('-ch', '--chunk', dest='chunk_size', type=int, default=0,
+        help='Read the correlation files simultaneously in chunks of this many sqs, so that the memory needed does not depend on the number of sqs. Reads the files as a whole if omitted or 0.')
+    parser.add_argument('-nc', '--no-cache', dest='use_cache', action='store_false',
+        help='Always parse the input files. By default the parsed correlations (except when using -ch) and clusters are stored in \'.atat_cache\' and reused as long as the input files do not change.')
+    timings.add_arguments(parser)
 
-    global args
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
 
-    try:
-        random_correlation_file = open(args.random_correlation_file, 'r')
-    except:
-        print("\nFile {} not found.".format(args.random_correlation_file))
-        sys.exit()
-    lines = random_correlation_file.readlines()
-    global num_sqs
-    num_sqs = len(lines)
+    for file_name in [args.random_correlation_file, args.sqs_correlation_file, args.structure_file, args.clusters_file]:
+        try:
+            open(file_name, 'r').close()
+        except:
+            print("\nFile {} not found.".format(file_name))
+            sys.exit()
+
+    if args.chunk_size > 0:
+        # Only the number of lines is determined beforehand, the correlations are read chunk by chunk later on.
+        num_sqs = count_lines(args.random_correlation_file)
+        num_clus = len(open(args.random_correlation_file, 'r').readline().split())
+    else:
+        with timer.stage('load correlations') as stage:
+            rcorr = load_correlations(args.random_correlation_file, args.use_cache)
+            scorr = load_correlations(args.sqs_correlation_file, args.use_cache)
+            stage.items = len(rcorr)
+        if rcorr.shape != scorr.shape:
+            print("\nThe files {} and {} contain different numbers of sqs or clusters.".format(args.random_correlation_file, args.sqs_correlation_file))
+            sys.exit()
+        num_sqs, num_clus = rcorr.shape
     print("\nNumber of sqs: \t\t", num_sqs)
-    global num_clus
-    num_clus = len(lines[0].split())
     print("Number of clusters: \t{} (including the point cluster)\n".format(num_clus))
 
-    rcorr = np.matrix([values for line in lines for values in line.split()], dtype=float).reshape((num_sqs, num_clus))
+    with timer.stage('load clusters') as stage:
+        clusters = read_clusters(args.clusters_file, args.structure_file, args.use_cache)
+        stage.items = len(clusters)
 
-    try:
-        sqs_correlation_file = open(args.sqs_correlation_file, 'r')
-    except:
-        print("\nFile {} not found.".format(args.sqs_correlation_file))
-        sys.exit()
-    lines = sqs_correlation_file.readlines()
-
-    scorr = np.matrix([values for line in lines for values in line.split()], dtype=float).reshape((num_sqs, num_clus))
-
-    try:
-        structure_file = open(args.structure_file, 'r')
-    except:
-        print("\nFile {} not found.".format(args.structure_file))
-        sys.exit()
-    lines = structure_file.readlines()
-    coordinate_system = np.matrix([values for vectors in lines[:3] for values in vectors.split()], dtype=float).reshape((3, 3))
-
-    try:
-        clusters_file = open(args.clusters_file, 'r')
-    except:
-        print("\nFile {} not found.".format(args.clusters_file))
-        sys.exit()
-    lines = clusters_file.readlines()
-    clusters = []
-    data = []
-    for line in lines:
-        if line != '\n':
-            data.append(line)
-        else:
-            clusters.append(Cluster(data, coordinate_system))
-            data = []
-
-    global damping
     damping = args.damping_constant
-
     output_file_name = args.output_file_name
+    num_best = args.num_best
 
-    error_list = print_errors(output_file_name, rcorr, scorr, clusters)
+    if args.chunk_size > 0:
+        top_k = [RunningTopK(num_selected(num_best, num_sqs), args.ties) for value in damping] if num_best != 0 else None
+        with timer.stage('errors (chunked)', num_sqs):
+            try:
+                print_errors_chunked(output_file_name, args.random_correlation_file, args.sqs_correlation_file, clusters, damping, args.chunk_size, top_k)
+            except ValueError as valerr:
+                print("\n{}".format(valerr))
+                sys.exit()
+    else:
+        with timer.stage('errors', num_sqs):
+            error_list = print_errors(output_file_name, rcorr, scorr, clusters, damping)
 
-    num_best = args.num_best
     if num_best != 0:
-        if num_best >= 1:
-            select_sqs(round(num_best), error_list)
-        else:
-            select_sqs(round(num_best*num_sqs), error_list)
+        with timer.stage('select and write best', num_sqs):
+            selections = [running.result(args.keep_order) for running in top_k] if args.chunk_size > 0 else select_sqs(error_list, num_best, args.ties, args.keep_order)
+            for d in range(len(damping)):
+                write_best_sqs(args.sqs_file, selections[d], best_sqs_file_name(d, damping))
+            print_overlap(selections, damping)
+    timer.finish()
 
 if __name__ == "__main__":
     main()
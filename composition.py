@@ -0,0 +1,75 @@
+import re               # Regular expression operations (for finding the atom types of interest).           https://docs.python.org/3/library/re.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+# Filtering of SQS by composition, e.g. all SQS with 8 Nb and 16 Ta atoms, or with 4 to 8 Nb atoms.
+# A condition is given as comma-separated constraints on the number of atoms of single atom types:
+#
+#     Nb=8,Ta=16        exactly 8 Nb and 16 Ta atoms
+#     Nb=4:8            between 4 and 8 Nb atoms (both included)
+#     Nb=4:,Ta=:10      at least 4 Nb and at most 10 Ta atoms
+#
+# Atom types not mentioned are not restricted, atom types not present in a SQS count as 0 atoms.
+# Several conditions can be applied at once, sorting every SQS into the bucket of each condition it fulfils.
+
+class Condition:
+    def __init__(self, text):
+        self.text = text
+        self.bounds = {}                        # Atom type -> (minimum, maximum), None meaning unbounded.
+        for constraint in text.split(","):
+            try:
+                atom_type, value = constraint.split("=")
+                if ":" in value:
+                    low, high = value.split(":")
+                    bounds = (int(low) if low else None, int(high) if high else None)
+                else:
+                    bounds = (int(value), int(value))
+            except ValueError:
+                raise ValueError("Invalid composition constraint \'{}\' (expected e.g. \'Nb=8\', \'Nb=4:8\', \'Nb=4:\' or \'Nb=:8\').".format(constraint))
+            self.bounds[atom_type.strip()] = bounds
+
+    # Whether a SQS with the given number of atoms of each type (dictionary) fulfils the condition.
+    def matches(self, counts):
+        for atom_type, (low, high) in self.bounds.items():
+            num = counts.get(atom_type, 0)
+            if (low is not None and num < low) or (high is not None and num > high):
+                return False
+        return True
+
+    # Which of the SQS of an index (see sqs_index.py) fulfil the condition, as boolean array.
+    def mask(self, sqs_index):
+        selected = np.ones(len(sqs_index), dtype=bool)
+        for atom_type, (low, high) in self.bounds.items():
+            counts = sqs_index.counts(atom_type)
+            if low is not None:
+                selected &= counts >= low
+            if high is not None:
+                selected &= counts <= high
+        return selected
+
+    # Short name for file names, e.g. 'Nb8_Ta16', 'Nb4-8' or 'Nb4-'.
+    def tag(self):
+        parts = []
+        for atom_type, (low, high) in self.bounds.items():
+            if low == high:
+                parts.append("{}{}".format(atom_type, low))
+            else:
+                parts.append("{}{}-{}".format(atom_type, low or 0, "" if high is None else high))
+        return "_".join(parts)
+
+
+def split_blocks(blocks, conditions):
+    # Generator yielding (block, list of the numbers of the conditions fulfilled) for every SQS of blocks.
+    # Only the atom types mentioned in the conditions are counted, as whole last column of the atom lines (so 'Nb' does not match e.g. 'Nbx').
+    # Blocks in the usual format (single spaces, no trailing whitespace) are counted by str.count of ' [atom type]\n',
+    # all others by a regular expression allowing for tabs and trailing whitespace.
+    atom_types = sorted({atom_type for condition in conditions for atom_type in condition.bounds}, key=len, reverse=True)
+    pattern = re.compile(r'[ \t](' + "|".join(re.escape(atom_type) for atom_type in atom_types) + r')[ \t\r]*$', re.MULTILINE)
+    for block in blocks:
+        text = block.text
+        if '\t' in text or '\r' in text or ' \n' in text or not text.endswith('\n'):
+            counts = {}
+            for atom_type in pattern.findall(text):
+                counts[atom_type] = counts.get(atom_type, 0)+1
+        else:
+            counts = {atom_type: text.count(" "+atom_type+"\n") for atom_type in atom_types}
+        yield block, [i for i, condition in enumerate(conditions) if condition.matches(counts)]
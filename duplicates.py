@@ -0,0 +1,113 @@
+import hashlib          # Secure hashes (for the keys of the fingerprint index).                            https://docs.python.org/3/library/hashlib.html
+import itertools        # Functions creating iterators for efficient looping (for the periodic images).     https://docs.python.org/3/library/itertools.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+# Detection of SQS that are the same structure up to a translation, a permutation of the sites or another choice of the lattice vectors.
+# Every structure is reduced to a fingerprint that does not change under these operations:
+#
+#     for every pair of atom types (a,b) with a <= b (by name): the sorted distances between all atoms of type a and b,
+#     each one the shortest distance under the periodic lattice, rounded to the tolerance (a histogram with bins of width tolerance)
+#
+# plus the numbers of atoms of each type and the volume of the cell. The fingerprint is hashed (sha1) and only selects a bucket of a dictionary,
+# so each structure is compared to the few structures seen before with the same fingerprint instead of all of them.
+#
+# Equal fingerprints do not prove equal structures: different structures with the same pair distances (homometric structures) are common
+# among SQS of a common parent lattice, whose pair correlations are tuned to the same values. A structure is therefore only taken as a duplicate
+# of one in its bucket after an explicit comparison (see same_structure): an atom of the rarest type is aligned by a translation, then every atom
+# has to lie within the tolerance of its own atom of the same type. Distances close to the boundary of two bins may end up in different bins
+# for two copies of a structure, so duplicates might be missed (but different structures are never merged).
+
+DEFAULT_TOLERANCE = 1e-3        # Width of the bins of the distances in Angstroem.
+
+def periodic_distances(lattice, coords):
+    # Shortest distances under the periodic lattice (rows: lattice vectors) between all pairs i < j of the atoms (rows of coords, cartesian).
+    # The fractional differences are wrapped to [-0.5, 0.5] first, then the 27 neighbouring images are checked,
+    # so the result does not depend on the choice of the lattice vectors (as long as they are not extremely skewed).
+    first, second = np.triu_indices(len(coords), 1)
+    frac = coords @ np.linalg.inv(lattice)
+    diff = frac[second]-frac[first]
+    diff -= np.rint(diff)
+    images = np.array(list(itertools.product([-1, 0, 1], repeat=3)), dtype=float)
+    vectors = (diff[:,None,:]+images[None,:,:]) @ lattice                                  # (pairs,27,3)
+    return np.sqrt(np.min(np.einsum('pik,pik->pi', vectors, vectors), axis=1)), first, second
+
+def fingerprint(lattice, coords, atom_types, tolerance=DEFAULT_TOLERANCE):
+    # Fingerprint (bytes) of a structure given its lattice vectors (rows, cartesian), the cartesian coordinates of the atoms (rows) and their types.
+    names = sorted(set(atom_types))
+    codes = np.array([names.index(atom_type) for atom_type in atom_types], dtype=np.int64)
+    distances, first, second = periodic_distances(np.asarray(lattice, dtype=float), np.asarray(coords, dtype=float))
+    pairs = np.minimum(codes[first], codes[second])*len(names)+np.maximum(codes[first], codes[second])
+    bins = np.rint(distances/tolerance).astype(np.int64)
+    order = np.lexsort((bins, pairs))
+    counts = np.bincount(codes, minlength=len(names))
+    volume = int(np.rint(abs(np.linalg.det(lattice))/tolerance))
+    header = ",".join("{}={}".format(name, count) for name, count in zip(names, counts.tolist()))+";{}".format(volume)
+    return hashlib.sha1(header.encode()+pairs[order].tobytes()+bins[order].tobytes()).digest()
+
+def structure_atoms(structure):
+    # Lattice vectors, cartesian coordinates and types of the atoms of a sqs_structure.Structure (or a structure of a collection, see sqs_collection.py).
+    return structure.lattice_vectors_car, structure.coords_car(), np.repeat(structure.atom_types, structure.atom_numbers).tolist()
+
+def structure_fingerprint(structure, tolerance=DEFAULT_TOLERANCE):
+    # Fingerprint of a sqs_structure.Structure (or a structure of a collection, see sqs_collection.py).
+    return fingerprint(*structure_atoms(structure), tolerance)
+
+def matched(frac, other_frac, lattice, tolerance=DEFAULT_TOLERANCE):
+    # True if every atom (rows of frac, fractional coordinates) has its own atom of other_frac within tolerance (Angstroem) under the periodic lattice.
+    # The tolerance is far below the size of the cell, so wrapping the fractional differences to [-0.5, 0.5] finds the close image.
+    diff = other_frac[None,:,:]-frac[:,None,:]
+    diff -= np.rint(diff)
+    vectors = diff @ lattice                                                                # (atoms,other atoms,3)
+    distances = np.einsum('ijk,ijk->ij', vectors, vectors)
+    nearest = np.argmin(distances, axis=1)
+    return bool(np.all(distances[np.arange(len(frac)), nearest] <= tolerance**2)) and len(np.unique(nearest)) == len(frac)
+
+def same_structure(lattice, coords, atom_types, other_lattice, other_coords, other_atom_types, tolerance=DEFAULT_TOLERANCE):
+    # True if the second structure is the first one up to a translation, a permutation of the sites or another choice of the lattice vectors
+    # (rows, cartesian), with every atom (rows of coords, cartesian) within tolerance (Angstroem) of an atom of the same type.
+    lattice, other_lattice = np.asarray(lattice, dtype=float), np.asarray(other_lattice, dtype=float)
+    inverse = np.linalg.inv(lattice)
+    basis = np.rint(other_lattice @ inverse)
+    if abs(abs(np.linalg.det(basis))-1) > 0.5 or np.max(np.linalg.norm(basis @ lattice-other_lattice, axis=1)) > tolerance:
+        return False                                                                        # Not the same periodic lattice.
+    atom_types, other_atom_types = np.asarray(atom_types), np.asarray(other_atom_types)
+    names, counts = np.unique(atom_types, return_counts=True)
+    other_names, other_counts = np.unique(other_atom_types, return_counts=True)
+    if not (np.array_equal(names, other_names) and np.array_equal(counts, other_counts)):
+        return False
+    frac, other_frac = np.asarray(coords, dtype=float) @ inverse, np.asarray(other_coords, dtype=float) @ inverse
+    species = [(frac[atom_types == name], other_frac[other_atom_types == name]) for name in names[np.argsort(counts, kind='stable')]]
+    # Every atom of the rarest type in the second structure is tried as the image of the first atom of this type in the first structure.
+    for shift in species[0][0][0]-species[0][1]:
+        if all(matched(first, second+shift, lattice, tolerance) for first, second in species):
+            return True
+    return False
+
+
+class FingerprintIndex:
+    # Index of the distinct structures seen so far, kept in buckets by their fingerprint. Each one is stored with the number it was found for.
+    def __init__(self):
+        self.buckets = {}                       # fingerprint -> [(number, lattice, coords, atom types)] of the distinct structures.
+        self.num_structures = 0
+        self.duplicates = []                    # (number, number of the earlier structure) of every duplicate found.
+
+    def __len__(self):
+        return self.num_structures
+
+    # Adds structure number (lattice vectors, cartesian coordinates and types of the atoms), returns True if it is no duplicate of a structure seen before.
+    def add(self, lattice, coords, atom_types, number, tolerance=DEFAULT_TOLERANCE):
+        lattice, coords, atom_types = np.asarray(lattice, dtype=float), np.asarray(coords, dtype=float), list(atom_types)
+        bucket = self.buckets.setdefault(fingerprint(lattice, coords, atom_types, tolerance), [])
+        for first, *structure in bucket:
+            if same_structure(*structure, lattice, coords, atom_types, tolerance):
+                self.duplicates.append((number, first))
+                return False
+        bucket.append((number, lattice, coords, atom_types))
+        self.num_structures += 1
+        return True
+
+    def add_structure(self, structure, number, tolerance=DEFAULT_TOLERANCE):
+        # Like add for a sqs_structure.Structure (or a structure of a collection).
+        return self.add(*structure_atoms(structure), number, tolerance)
+
+
@@ -3,113 +3,105 @@ import os               # Miscellaneous operating system interfaces (e.g. for ma
 import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
 import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
 import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
-
-def my_length(vec):
-    return np.sqrt(sum([value**2 for value in vec]))
-
-def main():
-    parser = argparse.ArgumentParser(description='Determine average lattice constant of random Li(NbTa)O3 alloy.')
-
-    parser.add_argument('-i', '--ifile', dest='file_name', type=str, help='Name of input file (some POSCAR or CONTCAR etc.). Defaults to \'CONTCAR\' if omitted.', required=False, default='CONTCAR')
-    parser.add_argument('-t', '--tol', dest='tolerance', type=float, help='Maximum mismatch between the lengths of the relaxed and unrelaxed lattice vectors. Defaults to 0.1 Angstroem if omitted.', required=False, default=0.5)
-    
-    args = parser.parse_args()
-
-    tol = args.tolerance
-    input_content = [line.rstrip() for line in open(args.file_name, 'r').readlines()]
-
-    conc = float(input_content[6].split()[2])/24
-    # print(conc)
-
-    scale = float(input_content[1])
-    lattice_vectors = [[scale*float(value) for value in line.split()] for line in input_content[2:5]]
-
-    lengths = [my_length(vector) for vector in lattice_vectors]
-
-    # print(lattice_vectors)
-    # print()
-    # print(lengths)
-    # print()
-
-    # index = lengths.index(min(lengths))
-    # lengths.pop(index)
-    # a = lattice_vectors.pop(index)
-    # index = lengths.index(min(lengths))
-    # lengths.pop(index)
-    # b = lattice_vectors.pop(index)
-    # c = lattice_vectors.pop(index)
-
-    a, b, c = [lattice_vectors[lengths.index(length)] for length in sorted(lengths)]
-    lengths = [my_length(vector) for vector in [a, b, c]]
-
-    # print(a)
-    # print(b)
-    # print(c)
-    # print()
+import itertools        # Functions creating iterators for efficient looping (for permuting the vectors).   https://docs.python.org/3/library/itertools.html
+from poscar_reader import find_files, read_cells
+import timings
+
+# Reference cells of the Li(NbTa)O3 supercells: lengths of the lattice vectors a, b, c (in Angstroem) and the three distances between
+# neighbouring Nb/Ta sites as combinations of the lattice vectors, d_k = |D[k][0]*a + D[k][1]*b + D[k][2]*c|.
+# The lattice constant is the mean of d_1, d_2 and d_3. Supercells made of several reference cells along a, b and/or c are recognised as well,
+# their lattice vectors are divided by the number of reference cells along each of them.
+TEMPLATES = [
+    # Name       a        b         c          d_1          d_2                 d_3
+    ('long',   [5.1616, 8.9401, 27.8036], [[1, 0, 0],   [1/2, 1/2, 0],   [1/2, -1/2, 0]]),
+    ('medium', [5.1616, 13.9018, 17.8802], [[1, 0, 0],   [1/2, 0, 1/4],   [1/2, 0, -1/4]]),
+    ('short',  [8.9401, 10.3232, 13.9018], [[0, 1/2, 0], [1/2, 1/4, 0],   [1/2, -1/4, 0]]),
+]
+
+PERMUTATIONS = np.array(list(itertools.permutations(range(3))))
+
+def classify(lattices, tolerance):
+    # Template (index into TEMPLATES, -1 if none fits) and the lattice vectors of a single reference cell, (M,3,3), for all cells at once.
+    # The lattice vectors of each cell are sorted by length (ties keep the order of the file) and all their permutations are compared with every template,
+    # so cells with vectors of equal length or supercells with a different order of lengths are recognised as well.
+    # A cell fits a template if every vector (divided by the number of reference cells along it) differs by less than tolerance from the reference length.
+    # If several templates or permutations fit, the one with the fewest reference cells wins (the first one in TEMPLATES in case of a tie).
+    reference = np.array([template[1] for template in TEMPLATES])                                   # (T,3)
+    order = np.argsort(np.linalg.norm(lattices, axis=2), axis=1, kind='stable')
+    lattices = np.take_along_axis(lattices, order[:,:,None], axis=1)
+    lengths = np.linalg.norm(lattices, axis=2)[:,PERMUTATIONS]                                      # (M,P,3)
+    multiples = np.maximum(np.rint(lengths[:,None,:,:]/reference[None,:,None,:]), 1)              # (M,T,P,3)
+    fits = np.all(np.abs(lengths[:,None,:,:]/multiples-reference[None,:,None,:]) < tolerance, axis=3)
+    cost = np.where(fits, np.prod(multiples, axis=3), np.inf).reshape((len(lattices), -1))
+    best = np.argmin(cost, axis=1)
+    template, permutation = np.divmod(best, len(PERMUTATIONS))
+    template[np.isinf(cost[np.arange(len(lattices)),best])] = -1
+    cells = np.arange(len(lattices))
+    unit_cells = lattices[cells[:,None],PERMUTATIONS[permutation]]/multiples[cells,template,permutation][:,:,None]
+    return template, unit_cells
+
+def d_spacings(template, unit_cells):
+    # (M,3) distances d_1, d_2, d_3 of all cells (nan for cells without template).
+    combinations = np.array([entry[2] for entry in TEMPLATES], dtype=float)[template]             # (M,3,3)
+    distances = np.linalg.norm(np.einsum('mkj,mjx->mkx', combinations, unit_cells), axis=2)
+    distances[template < 0] = np.nan
+    return distances
+
+def atom_count(cells, i, atom_type):
+    # Number of atoms of the given type (or within the given column, if a number) of cell i.
+    if atom_type.isdigit():
+        return cells.atom_counts[i][int(atom_type)]
+    if cells.atom_types[i] is None:
+        raise ValueError("no atom types given, use column numbers instead.")
+    if atom_type not in cells.atom_types[i]:
+        return 0
+    return cells.atom_counts[i][cells.atom_types[i].index(atom_type)]
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Determine average lattice constant of random Li(NbTa)O3 alloy.')
+
+    parser.add_argument('-i', '--ifile', nargs='+', dest='file_names', type=str, help='Names of input files (some POSCAR or CONTCAR etc.), directories (searched for CONTCAR files) or glob patterns. Defaults to \'CONTCAR\' if omitted.', required=False, default=['CONTCAR'])
+    parser.add_argument('-t', '--tol', dest='tolerance', type=float, help='Maximum mismatch between the lengths of the relaxed and unrelaxed lattice vectors. Defaults to 0.5 Angstroem if omitted.', required=False, default=0.5)
+    parser.add_argument('-s', '--species', dest='species', type=str, help='Atom type (or column of the numbers of atoms, counted from 0) whose concentration gets printed. Defaults to \'Ta\'.', required=False, default='Ta')
+    parser.add_argument('--sites', nargs='+', dest='sites', type=str, help='Atom types (or columns) sharing the sites of the species, the concentration being relative to their total number. Defaults to \'Nb Ta\'.', required=False, default=['Nb', 'Ta'])
+    parser.add_argument('-j', '--threads', dest='threads', type=int, help='Number of threads reading the files. Defaults to 8.', required=False, default=8)
+    timings.add_arguments(parser)
+
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    with timer.stage('read') as stage:
+        file_names = find_files(args.file_names, ['CONTCAR'])
+        if not file_names:
+            print("No input files found.")
+            sys.exit(-1)
+        cells, failed = read_cells(file_names, args.threads)
+        stage.items = len(file_names)
+    for file_name, err in failed:
+        print("Skipped {}: {}".format(file_name, err))
+    if len(cells) == 0:
+        print("No cells could be read.")
+        sys.exit(-1)
+
+    # Classification and distances of all cells at once:
+    with timer.stage('classify') as stage:
+        template, unit_cells = classify(cells.lattices, args.tolerance)
+        lattice_constants = np.mean(d_spacings(template, unit_cells), axis=1)
+        stage.items = len(cells)
 
     struc_not_found = "Structure not found, check tolerance or structure."
-
-    if my_length(a)>5.1616-tol and my_length(a)<5.1616+tol:
-        if my_length(b)>8.9401-tol and my_length(b)<8.9401+tol:
-            if my_length(c)>27.8036-tol and my_length(c)<27.8036+tol:
-                struc = 'long'
-            else: print(struc_not_found)
-        elif my_length(b)>13.9018-tol and my_length(b)<13.9018+tol:
-            if my_length(c)>17.8802-tol and my_length(c)<17.8802+tol:
-                struc = 'medium'
-            else: print(struc_not_found)
-        else: print(struc_not_found)
-    elif my_length(a)>8.9401-tol and my_length(a)<8.9401+tol:
-        if my_length(b)>10.3232-tol and my_length(b)<10.3232+tol and my_length(c)>13.9018-tol and my_length(c)<13.9018+tol:
-            struc = 'short'
-        else: print(struc_not_found)
-    else: print(struc_not_found)
-
-    # print("Structure is {}.".format(struc))
-    # print()
-
-    if struc == 'short':
-        d_1 = my_length(b)/2
-        d_2 = my_length([a[i]+b[i]/2 for i in range(3)])/2
-        d_3 = my_length([a[i]-b[i]/2 for i in range(3)])/2
-        # print(d_1, d_2, d_3)
-        # print()
-
-    if struc == 'medium':
-        d_1 = my_length(a)
-        d_2 = my_length([a[i]+c[i]/2 for i in range(3)])/2
-        d_3 = my_length([a[i]-c[i]/2 for i in range(3)])/2
-        # print(d_1, d_2, d_3)
-        # print()
-
-    if struc == 'long':
-        d_1 = my_length(a)
-        d_2 = my_length([a[i]+b[i] for i in range(3)])/2
-        d_3 = my_length([a[i]-b[i] for i in range(3)])/2
-        # print(d_1, d_2, d_3)
-        # print()
-
-    print(str(conc)+"\t"+str((d_1+d_2+d_3)/3))
-
-
-    # atoms = [[float(val) for val in input_content[8+i].split()] for i in range(num_atoms)]
-
-    # char=str(input_content[7])[0]
-    # if char in ['D', 'd']:
-    #     lattice = np.matrix([values for vectors in input_content[2:5] for values in vectors.split()], dtype=float).reshape((3, 3))
-    #     # print(input_content[2:5])
-    #     # print(lattice)
-    #     # quit()
-    #     positions_test = [np.dot(lattice, atom).tolist()[0] for atom in atoms]
-    #     # print(positions)
-    # else:
-    #     positions_test = atoms
-    #     # print(positions)
-    # # print(atoms)
-
-    # for i in range(num_atoms):
-    #     print(np.sqrt(sum([(positions[i][k]-positions_test[i][k])**2 for k in range(3)])))
-
+    for i, file_name in enumerate(cells.file_names):
+        prefix = file_name+"\t" if len(file_names) > 1 else ""
+        if template[i] < 0:
+            print(prefix+struc_not_found)
+            continue
+        try:
+            conc = atom_count(cells, i, args.species)/sum(atom_count(cells, i, site) for site in args.sites)
+        except (ValueError, IndexError, ZeroDivisionError) as err:
+            print(prefix+"Concentration not found: {}".format(err))
+            continue
+        print(prefix+str(conc)+"\t"+str(float(lattice_constants[i])))
+    timer.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+#!/opt/local/bin/python
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import itertools        # Functions creating iterators for efficient looping (for the neighbouring cells).  https://docs.python.org/3/library/itertools.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from concurrent.futures import ProcessPoolExecutor      # Pool of worker processes.                         https://docs.python.org/3/library/concurrent.futures.html
+from poscar_reader import find_files, read_structure
+import sqs_collection
+import timings
+
+# Distances between the atoms of periodic cells (e.g. relaxed CONTCAR files), including the periodic images of the atoms.
+# All pairs of atoms closer than a cutoff are found with a cell list: the cell is divided into a grid of bins at least as wide as the cutoff
+# (perpendicular to each pair of lattice vectors), every atom is only compared to the atoms of the neighbouring bins. The comparison is vectorized
+# over all atoms, one neighbouring bin (offset) after another, so the time needed grows linearly with the number of atoms.
+# Cells thinner than the cutoff are searched over as many periodic images as needed.
+#
+# The pairs are the basis of radial distribution functions, statistics of the distances between two atom types (e.g. Nb-O between 3.5 and 6.5 Angstroem)
+# and coordination numbers. These replace the loop over all pairs of atoms (without periodic images) of the old version of get_lat_const.py.
+
+class NeighborList:
+    # Pairs of atoms closer than the cutoff: atom first[p], and the periodic image of atom second[p] at first[p]+vectors[p] (cartesian).
+    # Without full, every pair is listed once (first < second, or an atom and one of its own images), with full in both directions.
+    def __init__(self, first, second, vectors, num_atoms, cutoff, full=False):
+        self.first = first
+        self.second = second
+        self.vectors = vectors
+        self.distances = np.sqrt(np.einsum('pk,pk->p', vectors, vectors))
+        self.num_atoms = num_atoms
+        self.cutoff = cutoff
+        self.full = full
+
+    def __len__(self):
+        return len(self.first)
+
+def cell_heights(lattice):
+    # Distance between the opposite faces of the cell, for the faces spanned by b and c, c and a, a and b.
+    return abs(np.linalg.det(lattice))/np.linalg.norm(np.cross(lattice[[1, 2, 0]], lattice[[2, 0, 1]]), axis=1)
+
+def lexicographic_positive(shifts):
+    # True for the shifts (rows) whose first nonzero component is positive.
+    signs = np.sign(shifts)
+    return np.where(signs[:,0] != 0, signs[:,0], np.where(signs[:,1] != 0, signs[:,1], signs[:,2])) > 0
+
+def neighbor_list(lattice, coords, cutoff, full=False):
+    # All pairs of atoms (cartesian coordinates as rows) within cutoff under the periodic lattice (lattice vectors as rows), see NeighborList.
+    lattice = np.asarray(lattice, dtype=float)
+    coords = np.asarray(coords, dtype=float).reshape((-1, 3))
+    num_atoms = len(coords)
+    frac = coords @ np.linalg.inv(lattice)
+    frac -= np.floor(frac)
+
+    heights = cell_heights(lattice)
+    num_bins = np.maximum(1, np.floor(heights/cutoff).astype(int))
+    reach = np.ceil(cutoff*num_bins/heights).astype(int)            # Number of neighbouring bins to search in each direction (1 unless thinner than the cutoff).
+    bins = np.minimum((frac*num_bins).astype(int), num_bins-1)        # (N,3)
+    bin_ids = np.ravel_multi_index(bins.T, num_bins)
+    order = np.argsort(bin_ids, kind='stable')                        # Atoms sorted by bin, the atoms of bin b are order[starts[b]:starts[b]+counts[b]].
+    counts = np.bincount(bin_ids, minlength=int(np.prod(num_bins)))
+    starts = np.cumsum(counts)-counts
+
+    first, second, vectors = [], [], []
+    for offset in itertools.product(*[range(-r, r+1) for r in reach.tolist()]):
+        neighbor = bins+offset
+        shift = np.floor_divide(neighbor, num_bins)                  # Periodic image the neighbouring bin belongs to.
+        neighbor_ids = np.ravel_multi_index((neighbor-shift*num_bins).T, num_bins)
+        num = counts[neighbor_ids]
+        i = np.repeat(np.arange(num_atoms), num)
+        j = order[np.repeat(starts[neighbor_ids]-(np.cumsum(num)-num), num)+np.arange(len(i))]
+        s = shift[i]
+        d = (frac[j]+s-frac[i]) @ lattice
+        keep = np.einsum('pk,pk->p', d, d) <= cutoff**2
+        if full:
+            keep &= (i != j) | np.any(s != 0, axis=1)
+        else:
+            keep &= (i < j) | ((i == j) & lexicographic_positive(s))
+        first.append(i[keep])
+        second.append(j[keep])
+        vectors.append(d[keep])
+    return NeighborList(np.concatenate(first), np.concatenate(second), np.concatenate(vectors).reshape((-1, 3)), num_atoms, cutoff, full)
+
+def pair_mask(neighbors, atom_types, pair):
+    # Pairs of the neighbor list between atoms of the two given types (in any order).
+    atom_types = np.asarray(atom_types)
+    first, second = atom_types[neighbors.first], atom_types[neighbors.second]
+    return ((first == pair[0]) & (second == pair[1])) | ((first == pair[1]) & (second == pair[0]))
+
+def radial_distribution(neighbors, atom_types, volume, r_max, num_bins=200, pair=None):
+    # Radial distribution function g(r) up to r_max (at most the cutoff of the neighbor list),
+    # of all atoms or of the given pair of atom types. Returns the centers of the bins and g(r).
+    atom_types = np.asarray(atom_types)
+    edges = np.linspace(0, r_max, num_bins+1)
+    if pair is None:
+        distances = neighbors.distances
+        num_first = num_second = len(atom_types)
+    else:
+        distances = neighbors.distances[pair_mask(neighbors, atom_types, pair)]
+        num_first, num_second = np.count_nonzero(atom_types == pair[0]), np.count_nonzero(atom_types == pair[1])
+    counts = np.histogram(distances, bins=edges)[0].astype(float)
+    if neighbors.full:
+        counts /= 2
+    if pair is None or pair[0] == pair[1]:
+        counts *= 2                             # Every pair of equal types counts for both of its atoms.
+    shells = 4/3*np.pi*(edges[1:]**3-edges[:-1]**3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g = np.nan_to_num(volume*counts/(num_first*num_second*shells))
+    return (edges[1:]+edges[:-1])/2, g
+
+def pair_statistics(neighbors, atom_types, r_min=0.0, r_max=None):
+    # Number, mean, standard deviation, minimum and maximum of the distances between every pair of atom types (sorted by name) within [r_min, r_max].
+    atom_types = np.asarray(atom_types)
+    names = sorted(set(atom_types.tolist()))
+    codes = np.searchsorted(names, atom_types)
+    r_max = neighbors.cutoff if r_max is None else r_max
+    keep = (neighbors.distances >= r_min) & (neighbors.distances <= r_max)
+    first, second = codes[neighbors.first[keep]], codes[neighbors.second[keep]]
+    pair_codes = np.minimum(first, second)*len(names)+np.maximum(first, second)
+    distances = neighbors.distances[keep]
+    statistics = {}
+    for code in np.unique(pair_codes).tolist():
+        values = distances[pair_codes == code]
+        statistics[(names[code//len(names)], names[code % len(names)])] = {'count': len(values), 'mean': float(np.mean(values)),
+            'std': float(np.std(values)), 'min': float(np.min(values)), 'max': float(np.max(values))}
+    return statistics
+
+def coordination(neighbors, atom_types, center, neighbor, r_max=None):
+    # Number of atoms of type neighbor within r_max (defaults to the cutoff) of every atom of type center.
+    atom_types = np.asarray(atom_types)
+    r_max = neighbors.cutoff if r_max is None else r_max
+    near = neighbors.distances <= r_max
+    counts = np.bincount(neighbors.first[near & (atom_types[neighbors.second] == neighbor)], minlength=neighbors.num_atoms)
+    if not neighbors.full:
+        counts += np.bincount(neighbors.second[near & (atom_types[neighbors.first] == neighbor)], minlength=neighbors.num_atoms)
+    return counts[atom_types == center]
+
+def neighbors_of(neighbors, atom):
+    # Indices, distances and vectors (from atom) of all neighbors of the given atom within the cutoff.
+    forward, backward = neighbors.first == atom, (neighbors.second == atom) & (not neighbors.full)
+    return (np.concatenate((neighbors.second[forward], neighbors.first[backward])), np.concatenate((neighbors.distances[forward], neighbors.distances[backward])),
+        np.concatenate((neighbors.vectors[forward], -neighbors.vectors[backward])).reshape((-1, 3)))
+
+def analyze_structure(lattice, types, coords, r_min, r_max, pairs, num_bins):
+    # Statistics of the distances and radial distribution functions (None without num_bins) of a single structure (types: one per atom).
+    neighbors = neighbor_list(lattice, coords, r_max)
+    statistics = pair_statistics(neighbors, types, r_min, r_max)
+    rdfs = None
+    if num_bins > 0:
+        volume = abs(np.linalg.det(lattice))
+        rdfs = [radial_distribution(neighbors, types, volume, r_max, num_bins, pair)[1] for pair in [None]+pairs]
+    return statistics, rdfs
+
+def analyze_file(file_name, r_min, r_max, pairs, num_bins):
+    # List of (name, statistics, radial distribution functions) or [(name, error, None)] of a single POSCAR/CONTCAR file,
+    # or of every SQS of a collection (see sqs_collection.py, named '[file name]:[number within the collection]'). Run by the worker processes.
+    if sqs_collection.is_collection(file_name):
+        try:
+            collection = sqs_collection.SQSCollection.load(file_name)
+        except (OSError, ValueError, KeyError) as err:
+            return [(file_name, err, None)]
+        results = []
+        for i in range(len(collection)):
+            coords, types = collection.atoms(i)
+            results.append(("{}:{}".format(file_name, i+1),)+analyze_structure(collection.lattices[i], types, coords, r_min, r_max, pairs, num_bins))
+        return results
+    try:
+        lattice, atom_types, atom_numbers, coords = read_structure(file_name)
+    except (OSError, ValueError, IndexError) as err:
+        return [(file_name, err, None)]
+    return [(file_name,)+analyze_structure(lattice, np.repeat(atom_types, atom_numbers), coords, r_min, r_max, pairs, num_bins)]
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Statistics of the distances between the atoms (including periodic images) and radial distribution functions of many CONTCAR/POSCAR files.')
+    parser.add_argument('paths', nargs='*', default=['.'],
+        help='Files, directories (searched recursively) or glob patterns, e.g. \'runs/*/CONTCAR\'. Collections of SQS (\'.npz\', see sqs_collection.py) are analysed SQS by SQS. Defaults to the current directory.')
+    parser.add_argument('-n', '--names', nargs='+', dest='names', default=['CONTCAR'], required=False,
+        help='Names of the files to look for within directories (glob patterns like \'POSCAR*\' allowed). Defaults to \'CONTCAR\'.')
+    parser.add_argument('-r', '--range', nargs=2, dest='range', type=float, default=[0.0, 6.5], metavar=('R_MIN', 'R_MAX'), required=False,
+        help='Range of the distances in Angstroem, e.g. \'3.5 6.5\'. Defaults to 0 6.5.')
+    parser.add_argument('-p', '--pair', nargs=2, dest='pairs', action='append', default=[], metavar=('TYPE', 'TYPE'), required=False,
+        help='Pair of atom types to print the statistics for, e.g. \'-p Nb O -p Ta O\'. May be given several times. Defaults to all pairs.')
+    parser.add_argument('--rdf', dest='rdf_file', type=str, default=None, required=False,
+        help='Write the radial distribution functions up to R_MAX (of all atoms and of each pair given by -p), averaged over all files, to this CSV file.')
+    parser.add_argument('--bins', dest='num_bins', type=int, default=200, required=False,
+        help='Number of bins of the radial distribution functions. Defaults to 200.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, required=False,
+        help='Number of worker processes analysing the files in parallel (0: one per CPU). Defaults to 1.')
+    timings.add_arguments(parser)
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    r_min, r_max = args.range
+    if r_max <= 0 or r_min > r_max:
+        print("\nInvalid range of distances: {} {}.\n".format(r_min, r_max))
+        sys.exit(-1)
+    file_names = find_files(args.paths, args.names)
+    if not file_names:
+        print("\nNo files named {} found within {}.\n".format(" or ".join(args.names), " ".join(args.paths)))
+        sys.exit(-1)
+
+    num_bins = args.num_bins if args.rdf_file is not None else 0
+    with timer.stage('analyze') as stage:
+        if args.jobs == 1:
+            results = [result for file_name in file_names for result in analyze_file(file_name, r_min, r_max, args.pairs, num_bins)]
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs if args.jobs > 0 else None) as pool:
+                results = list(itertools.chain.from_iterable(pool.map(analyze_file, file_names, itertools.repeat(r_min), itertools.repeat(r_max),
+                    itertools.repeat(args.pairs), itertools.repeat(num_bins), chunksize=max(1, len(file_names)//(8*(args.jobs or 8))))))
+        stage.items = len(results)
+
+    print("file\tpair\tcount\tmean\tstd\tmin\tmax")
+    rdfs = []
+    for file_name, statistics, file_rdfs in results:
+        if isinstance(statistics, Exception):
+            print("Skipped {}: {}".format(file_name, statistics))
+            continue
+        for pair in ([tuple(pair) for pair in args.pairs] or sorted(statistics)):
+            values = statistics.get(tuple(sorted(pair)))
+            if values is None:
+                print("{}\t{}-{}\t0".format(file_name, *pair))
+                continue
+            print("{}\t{}-{}\t{count}\t{mean:.6f}\t{std:.6f}\t{min:.6f}\t{max:.6f}".format(file_name, *pair, **values))
+        if file_rdfs is not None:
+            rdfs.append(file_rdfs)
+
+    if args.rdf_file is not None and rdfs:
+        edges = np.linspace(0, r_max, num_bins+1)
+        columns = np.column_stack([(edges[1:]+edges[:-1])/2]+list(np.mean(np.array(rdfs), axis=0)))
+        header = ",".join(['r', 'g']+["g_{}-{}".format(*pair) for pair in args.pairs])
+        np.savetxt(args.rdf_file, columns, delimiter=',', header=header, comments='', fmt='%.8f')
+        print("\nRadial distribution functions of {} files saved to \'{}\'.".format(len(rdfs), args.rdf_file))
+    timer.finish()
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,116 @@
 #!/opt/local/bin/python
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
 import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import timings
 
-def main():
-    global tol
-    tol = 10**(-8)
+# Screening of the supercells listed by mcsqs in sqscell.out for (nearly) orthogonal ones.
+# sqscell.out contains the number of cells followed by the cells, each one a blank line and three lines of lattice vectors
+# in units of the lattice vectors of lat.in. All cells are converted and compared at once:
+#
+#     X_car = X_org C                   (M,3,3) lattice vectors in cartesian coordinates, one row per vector
+#     G = X_car X_car^T                 (M,3,3) Gram matrices, G[m,i,j] being the dot product of vectors i and j of cell m
+#     cos(angle between i and j) = G[m,i,j]/sqrt(G[m,i,i] G[m,j,j])
 
-    lattice_file = [line.rstrip() for line in open("lat.in", 'r').readlines()]
-    coordinate_system = np.matrix([values for vectors in lattice_file[:3] for values in vectors.split()], dtype=float).reshape((3, 3))
+def read_coordinate_system(lattice_file_name):
+    lattice_file = [line.rstrip() for line in open(lattice_file_name, 'r').readlines()]
+    return np.array([vectors.split()[:3] for vectors in lattice_file[:3]], dtype=float)
 
-    sqscell_file = [line.rstrip() for line in open("sqscell.out", 'r').readlines()]
-    num_sqscells = int(sqscell_file.pop(0))
-    
-    num_orth = 0
-    
-    for i in range(num_sqscells):
+def read_sqscells(sqscell_file_name):
+    # All cells as (M,3,3) array plus the lines of the file (for writing selected cells unchanged).
+    lines = open(sqscell_file_name, 'r').read().splitlines()
+    num_sqscells = int(lines[0])
+    values = " ".join(lines[1:4*num_sqscells+1]).split()
+    return np.array(values[:9*num_sqscells], dtype=float).reshape((num_sqscells, 3, 3)), lines
 
-        lattice_vectors_org = np.matrix([values for vectors in sqscell_file[4*i+1:4*i+4] for values in vectors.split()], dtype=float).reshape((3, 3))
-        lattice_vectors_car = lattice_vectors_org*coordinate_system
+def gram_matrices(lattice_vectors_org, coordinate_system):
+    lattice_vectors_car = np.einsum('mij,jk->mik', lattice_vectors_org, coordinate_system)
+    return np.einsum('mij,mkj->mik', lattice_vectors_car, lattice_vectors_car)
 
-        a = lattice_vectors_car[0].reshape((3,1))
-        b = lattice_vectors_car[1].reshape((3,1))
-        c = lattice_vectors_car[2].reshape((3,1))
+def off_diagonal(gram):
+    # (M,3) dot products (or cosines) of the pairs a-b, b-c and c-a.
+    return np.stack([gram[:,0,1], gram[:,1,2], gram[:,2,0]], axis=1)
 
-        if abs(np.transpose(a)*b)<tol and abs(np.transpose(b)*c)<tol and abs(np.transpose(c)*a)<tol:
-            print(i)
+def max_cosines(gram):
+    # Largest |cos| of the angles between the lattice vectors of every cell (0 for orthogonal cells).
+    lengths = np.sqrt(np.einsum('mii->mi', gram))
+    return np.max(np.abs(off_diagonal(gram/(lengths[:,:,None]*lengths[:,None,:]))), axis=1)
+
+def aspect_ratios(gram):
+    # Ratio of longest to shortest lattice vector of every cell.
+    lengths = np.sqrt(np.einsum('mii->mi', gram))
+    return np.max(lengths, axis=1)/np.min(lengths, axis=1)
+
+def write_sqscells(output_file_name, lines, indices):
+    # Writes the selected cells in the format of sqscell.out (lines as found in the input file).
+    output_file = open(output_file_name, 'w')
+    output_file.write("{}\n".format(len(indices)))
+    output_file.write("".join("\n".join(lines[4*i+1:4*i+5])+"\n" for i in indices))
+    output_file.close()
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Find the (nearly) orthogonal supercells listed in sqscell.out, printing their indices (counted from 0) or writing them to a new sqscell.out.')
+    parser.add_argument('-i', dest='sqscell_file', type=str, default='sqscell.out', required=False,
+        help='Name of input file. Defaults to \'sqscell.out\' if omitted.')
+    parser.add_argument('-l', dest='lattice_file', type=str, default='lat.in', required=False,
+        help='Name of the lattice file (coordinate system). Defaults to \'lat.in\' if omitted.')
+    parser.add_argument('-t', '--tol', dest='tolerance', type=float, default=1e-8, required=False,
+        help='Maximum absolute value of the dot products between the lattice vectors (in Angstroem^2). Defaults to 1e-8.')
+    parser.add_argument('-c', '--cos', dest='max_cos', type=float, default=None, required=False,
+        help='Maximum absolute cosine of the angles between the lattice vectors (nearly orthogonal cells, e.g. 0.05), used instead of -t.')
+    parser.add_argument('-r', '--rank', dest='rank', action='store_true',
+        help='Sort the cells by their largest absolute cosine (most orthogonal first) and print it next to the index.')
+    parser.add_argument('-a', '--aspect', dest='max_aspect', type=float, default=None, required=False,
+        help='Maximum ratio of longest to shortest lattice vector.')
+    parser.add_argument('--min-volume', dest='min_volume', type=float, default=None, required=False,
+        help='Minimum volume of the cells in units of the unit cell of lat.in.')
+    parser.add_argument('--max-volume', dest='max_volume', type=float, default=None, required=False,
+        help='Maximum volume of the cells in units of the unit cell of lat.in.')
+    parser.add_argument('-o', dest='output_file', type=str, default=None, required=False,
+        help='Write the selected cells to this file (in the format of sqscell.out) instead of printing their indices.')
+    timings.add_arguments(parser)
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    with timer.stage('read') as stage:
+        try:
+            coordinate_system = read_coordinate_system(args.lattice_file)
+            lattice_vectors_org, lines = read_sqscells(args.sqscell_file)
+        except (OSError, ValueError, IndexError) as err:
+            print("Error while reading input: {}".format(err))
+            sys.exit(-1)
+        stage.items = len(lattice_vectors_org)
+
+    with timer.stage('screen') as stage:
+        gram = gram_matrices(lattice_vectors_org, coordinate_system)
+        cosines = max_cosines(gram)
+        if args.max_cos is not None:
+            selected = cosines <= args.max_cos
+        else:
+            selected = np.all(np.abs(off_diagonal(gram)) < args.tolerance, axis=1)
+        if args.max_aspect is not None:
+            selected &= aspect_ratios(gram) <= args.max_aspect
+        volumes = np.abs(np.linalg.det(lattice_vectors_org))
+        if args.min_volume is not None:
+            selected &= volumes >= args.min_volume
+        if args.max_volume is not None:
+            selected &= volumes <= args.max_volume
+
+        indices = np.flatnonzero(selected)
+        if args.rank:
+            indices = indices[np.argsort(cosines[indices], kind='stable')]
+        stage.items = len(lattice_vectors_org)
+
+    with timer.stage('output') as stage:
+        if args.output_file is not None:
+            write_sqscells(args.output_file, lines, indices)
+            print("{} of {} cells saved to \'{}\'.".format(len(indices), len(lattice_vectors_org), args.output_file))
+        elif args.rank:
+            print("".join("{}\t{:.6f}\n".format(i, cosines[i]) for i in indices), end="")
+        else:
+            print("".join("{}\n".format(i) for i in indices), end="")
+        stage.items = len(indices)
+    timer.finish()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,125 @@
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import io               # Core tools for working with streams (in-memory files for the tar archive).        https://docs.python.org/3/library/io.html
+import shutil           # High-level file operations (for deleting old results).                            https://docs.python.org/3/library/shutil.html
+import tarfile          # Read and write tar archive files.                                                 https://docs.python.org/3/library/tarfile.html
+import zipfile          # Work with ZIP archives.                                                           https://docs.python.org/3/library/zipfile.html
+
+# Output backends for POSCAR files. Every backend stores the POSCAR of SQS number n under the name poscar_[n]/POSCAR:
+#
+#     dir       one directory per SQS:                    output_files/poscar_[n]/POSCAR
+#     tar       all POSCAR files in a single tar archive: output_files.tar
+#     zip       all POSCAR files in a single zip archive: output_files.zip
+#     stream    all POSCAR files concatenated:            output_files.poscar
+#               with an index of number, byte offset and length of every POSCAR: output_files.poscar.idx
+#
+# The archive and stream backends create a single file instead of two file system entries per SQS,
+# which matters on parallel file systems where creating many small files is expensive.
+
+FORMATS = ['dir', 'tar', 'zip', 'stream']
+
+def output_name(base_name, output_format):
+    return base_name if output_format == 'dir' else base_name+{'tar': ".tar", 'zip': ".zip", 'stream': ".poscar"}[output_format]
+
+def member_name(number):
+    return "poscar_"+str(number)+"/POSCAR"
+
+def remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+def rotate(path):
+    # Renames previous results to [path]~, deleting the results before those. Returns a list of messages describing what has been done.
+    messages = []
+    if os.path.lexists(path):
+        if os.path.lexists(path+"~"):
+            remove(path+"~")
+            remove(path+".idx~")
+            messages.append("Deleted second to last results stored within \'/"+os.path.basename(path)+"~\'.")
+        os.rename(path, path+"~")
+        if os.path.lexists(path+".idx"):
+            os.rename(path+".idx", path+".idx~")
+        messages.append("Renamed previous results. \'/"+os.path.basename(path)+"\' is now \'/"+os.path.basename(path)+"~\'.")
+    return messages
+
+
+def write_directory(path, number, text):
+    # Writes a single POSCAR file to [path]/poscar_[number]/POSCAR with a single write.
+    poscar_dir = os.path.join(path, "poscar_"+str(number))
+    os.mkdir(poscar_dir)
+    with open(os.path.join(poscar_dir, "POSCAR"), 'w') as output_file:
+        output_file.write(text)
+
+
+class DirectoryOutput:
+    def __init__(self, path):
+        self.path = path
+        os.mkdir(path)
+
+    def write(self, number, text):
+        write_directory(self.path, number, text)
+
+    def close(self):
+        pass
+
+
+class TarOutput:
+    def __init__(self, path):
+        self.path = path
+        self.archive = tarfile.open(path, 'w')
+
+    def write(self, number, text):
+        data = text.encode()
+        info = tarfile.TarInfo(member_name(number))
+        info.size = len(data)
+        info.mtime = 0                          # Fixed, so the same input always results in the same archive.
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+class ZipOutput:
+    def __init__(self, path):
+        self.path = path
+        self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+
+    def write(self, number, text):
+        # Fixed date and time, so the same input always results in the same archive.
+        self.archive.writestr(zipfile.ZipInfo(member_name(number), (1980, 1, 1, 0, 0, 0)), text, zipfile.ZIP_DEFLATED)
+
+    def close(self):
+        self.archive.close()
+
+
+class StreamOutput:
+    def __init__(self, path):
+        self.path = path
+        self.output_file = open(path, 'wb')
+        self.index_file = open(path+".idx", 'w')
+        self.offset = 0
+
+    def write(self, number, text):
+        data = text.encode()
+        self.output_file.write(data)
+        self.index_file.write("{} {} {}\n".format(number, self.offset, len(data)))
+        self.offset += len(data)
+
+    def close(self):
+        self.output_file.close()
+        self.index_file.close()
+
+
+def open_output(path, output_format):
+    return {'dir': DirectoryOutput, 'tar': TarOutput, 'zip': ZipOutput, 'stream': StreamOutput}[output_format](path)
+
+def read_stream(path, number):
+    # The POSCAR of the given SQS number from a stream written by StreamOutput.
+    for line in open(path+".idx", 'r'):
+        entry = [int(val) for val in line.split()]
+        if entry[0] == number:
+            with open(path, 'rb') as input_file:
+                input_file.seek(entry[1])
+                return input_file.read(entry[2]).decode()
+    raise KeyError("SQS number {} not found in {}.".format(number, path))
@@ -0,0 +1,123 @@
+import os               # Miscellaneous operating system interfaces (e.g. for walking directory trees).     https://docs.python.org/3/library/os.html
+import glob             # Unix style pathname pattern expansion.                                            https://docs.python.org/3/library/glob.html
+import fnmatch          # Unix filename pattern matching (for the file names searched in directories).      https://docs.python.org/3/library/fnmatch.html
+import itertools        # Functions creating iterators for efficient looping (for reading the header only). https://docs.python.org/3/library/itertools.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from concurrent.futures import ThreadPoolExecutor       # Pool of threads (for reading many files at once). https://docs.python.org/3/library/concurrent.futures.html
+
+# Reading of the cells of many VASP POSCAR/CONTCAR files at once. Only the header of every file is read:
+#
+#     [comment]
+#     [scaling factor]          (one value, negative: volume of the cell, or three values: one per cartesian axis)
+#     [lattice vector a]
+#     [lattice vector b]
+#     [lattice vector c]
+#     [atom types]              (optional)
+#     [number of atoms of each type]
+#
+# The lattices of all files are stacked into a single (M,3,3) array (one row per lattice vector), so volumes, lengths and angles
+# are calculated for all cells at once. For the exact format, check the VASP manual: https://www.vasp.at/wiki/index.php/POSCAR
+
+HEADER_LINES = 7
+
+def find_files(paths, names=('CONTCAR', 'POSCAR')):
+    # Sorted list of all files given by paths: files, glob patterns (e.g. 'runs/*/CONTCAR' or 'runs/**/CONTCAR')
+    # and directories, which are searched recursively for files matching any of names (e.g. 'CONTCAR' or 'POSCAR*').
+    found = set()
+    for path in paths:
+        for match in (glob.glob(path, recursive=True) if glob.has_magic(path) else [path]):
+            if os.path.isdir(match):
+                for root, dirs, files in os.walk(match):
+                    found.update(os.path.join(root, file) for file in files if any(fnmatch.fnmatch(file, name) for name in names))
+            elif os.path.isfile(match):
+                found.add(match)
+    return sorted(found)
+
+def read_header(file_name):
+    # Scaling factors (three, one per cartesian axis) and lattice vectors (unscaled, as rows) of a single POSCAR/CONTCAR file,
+    # plus atom types (None if not given) and numbers of atoms. Raises OSError or ValueError for unreadable or malformed files.
+    with open(file_name, 'r') as input_file:
+        header = [line.split() for line in itertools.islice(input_file, HEADER_LINES)]
+    if len(header) < 6:
+        raise ValueError("incomplete header.")
+    scale = [float(val) for val in header[1]]
+    lattice = np.array([vector[:3] for vector in header[2:5]], dtype=float)
+    if lattice.shape != (3, 3) or len(scale) not in [1, 3]:
+        raise ValueError("malformed scaling factor or lattice vectors.")
+    if len(scale) == 1 and scale[0] < 0:
+        scale = [(-scale[0]/abs(np.linalg.det(lattice)))**(1/3)]            # A negative scaling factor is the volume of the cell.
+    atom_types = None
+    if not header[5][0].lstrip('-').isdigit():
+        atom_types = header[5]
+        header = header[1:]
+    atom_numbers = [int(val) for val in header[5]] if len(header) > 5 else []
+    return scale*3 if len(scale) == 1 else scale, lattice, atom_types, atom_numbers
+
+def read_structure(file_name):
+    # Complete structure of a single POSCAR/CONTCAR file: scaled lattice vectors (rows), atom types (numbered '0', '1', ... if not given in the file),
+    # numbers of atoms of each type and cartesian coordinates of all atoms (rows, in the order of the file).
+    # The positions follow the header, after an optional 'Selective dynamics' line and the line choosing direct or cartesian coordinates.
+    scale, lattice, atom_types, atom_numbers = read_header(file_name)
+    with open(file_name, 'r') as input_file:
+        lines = input_file.read().splitlines()[HEADER_LINES-(1 if atom_types is None else 0):]
+    if lines and lines[0].strip()[:1] in ['S', 's']:
+        lines = lines[1:]
+    if not lines:
+        raise ValueError("missing atom positions.")
+    cartesian = lines[0].strip()[:1] in ['C', 'c', 'K', 'k']
+    num_atoms = sum(atom_numbers)
+    values = " ".join(" ".join(line.split()[:3]) for line in lines[1:num_atoms+1]).split()          # Without the flags of selective dynamics.
+    if len(values) != 3*num_atoms:
+        raise ValueError("expected {} atom positions.".format(num_atoms))
+    lattice = lattice*np.array(scale)
+    coords = np.array(values, dtype=float).reshape((num_atoms, 3))
+    coords = coords*np.array(scale) if cartesian else coords @ lattice
+    if atom_types is None:
+        atom_types = [str(i) for i in range(len(atom_numbers))]
+    return lattice, atom_types, atom_numbers, coords
+
+class Cells:
+    def __init__(self, file_names, scales, lattices, atom_types, atom_counts):
+        self.file_names = file_names
+        self.lattices = lattices*scales[:,None,:]                           # (M,3,3) scaled lattice vectors, one row per vector.
+        self.atom_types = atom_types                                        # Atom types of every cell (None if not given in the file).
+        self.atom_counts = atom_counts                                      # Numbers of atoms of each type of every cell.
+        self.atom_numbers = np.array([sum(counts) for counts in atom_counts], dtype=int)      # (M,) total number of atoms.
+
+    def __len__(self):
+        return len(self.file_names)
+
+    def volumes(self):
+        return np.abs(np.linalg.det(self.lattices))
+
+    def lengths(self):
+        return np.linalg.norm(self.lattices, axis=2)                        # (M,3) lengths of a, b and c.
+
+    def angles(self):
+        # (M,3) angles alpha (between b and c), beta (a and c) and gamma (a and b) in degrees.
+        lengths = self.lengths()
+        gram = np.einsum('mij,mkj->mik', self.lattices, self.lattices)
+        cosines = np.stack([gram[:,1,2]/(lengths[:,1]*lengths[:,2]), gram[:,0,2]/(lengths[:,0]*lengths[:,2]), gram[:,0,1]/(lengths[:,0]*lengths[:,1])], axis=1)
+        return np.degrees(np.arccos(np.clip(cosines, -1, 1)))
+
+def safe_read_header(file_name):
+    try:
+        return read_header(file_name)
+    except (OSError, ValueError, IndexError) as err:
+        return err
+
+def read_cells(file_names, threads=1):
+    # Reads the headers of all given files (with a pool of threads if threads > 1, which helps on network file systems).
+    # Returns the Cells of all readable files and a list of (file name, error) for the others.
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            headers = list(pool.map(safe_read_header, file_names))
+    else:
+        headers = [safe_read_header(file_name) for file_name in file_names]
+    failed = [(file_name, header) for file_name, header in zip(file_names, headers) if isinstance(header, Exception)]
+    valid = [(file_name, header) for file_name, header in zip(file_names, headers) if not isinstance(header, Exception)]
+    cells = Cells([file_name for file_name, header in valid],
+        np.array([header[0] for file_name, header in valid], dtype=float).reshape((-1, 3)),
+        np.array([header[1] for file_name, header in valid], dtype=float).reshape((-1, 3, 3)),
+        [header[2] for file_name, header in valid], [header[3] for file_name, header in valid])
+    return cells, failed
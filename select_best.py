@@ -1,53 +1,155 @@
 #!/opt/local/bin/python
+import sys                  # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
 import argparse             # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
 import numpy as np          # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from sqs_index import load_index, read_blocks
+from selection import select_from_file, read_errors, num_selected
+from sqs_structure import Structure, StructureError
+import duplicates
+import sqs_collection
+import timings
 
 def restricted_float(x):
     if float(x) < 0.0:
         raise argparse.ArgumentTypeError("%r smaller than zero. Check -h for explanation of usage."%(x,))
     return float(x)
 
-def main():
-    parser = argparse.ArgumentParser(description='Select the best sqs when given the errors and structures.')
+def check_count(selected, num_sqs, error_file, sqs_file):
+    # Exits if a selected sqs (index, counted from 0) is missing in the sqs file, i.e. there are more errors than sqs.
+    if len(selected) and max(selected) >= num_sqs:
+        print("\nMore errors in \'{}\' than sqs in \'{}\' ({}).\n".format(error_file, sqs_file, num_sqs))
+        sys.exit(-1)
+
+def select_unique(errors, sqs_file_name, sqs_index, num_best, ties=False, keep_order=False, tolerance=duplicates.DEFAULT_TOLERANCE):
+    # Indices and blocks of the best distinct sqs: the candidates are read in order of their error (ranked like select_best),
+    # duplicates of better ones (see duplicates.py) are skipped until num_best sqs have been found. Also returns the fingerprint index.
+    ranking = np.lexsort((np.arange(len(errors)), errors)).tolist()
+    num_best = num_selected(num_best, len(errors))
+    index = duplicates.FingerprintIndex()
+    selected = []
+    for number, block in zip(ranking, read_blocks(sqs_file_name, sqs_index, ranking)):
+        if len(selected) >= num_best and not (ties and selected and errors[number] == errors[selected[-1][0]]):
+            break
+        if index.add_structure(Structure(block.lines, None, number+1), number, tolerance):
+            selected.append((number, block))
+    if keep_order:
+        selected.sort(key=lambda item: item[0])
+    return [number for number, block in selected], [block for number, block in selected], index
+
+def select_unique_collection(errors, collection, num_best, ties=False, keep_order=False, tolerance=duplicates.DEFAULT_TOLERANCE):
+    # Like select_unique for the sqs of a collection (see sqs_collection.py), which are fingerprinted directly from its arrays.
+    ranking = np.lexsort((np.arange(len(errors)), errors)).tolist()
+    num_best = num_selected(num_best, len(errors))
+    index = duplicates.FingerprintIndex()
+    selected = []
+    for number in ranking:
+        if len(selected) >= num_best and not (ties and selected and errors[number] == errors[selected[-1]]):
+            break
+        if sqs_collection.unique_indices(collection.take([number]), index, tolerance, [number]):
+            selected.append(number)
+    if keep_order:
+        selected.sort()
+    return selected, index
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Select the best sqs when given the errors and structures.')
 
     parser.add_argument('-e', dest='error_file', type=str, default='errors.out', required=False,
         help='Name of file containing the errors. Defaults to \'errors.out\' if omitted.')
+    parser.add_argument('-c', '--column', dest='column', type=int, default=0, required=False,
+        help='Column of the error file to select by, counted from 0. Error files written with several damping constants (compare_correlations.py -d 1,2,3) have one column per damping constant, in the order given. Defaults to 0.')
     parser.add_argument('-b', dest='num_best', type=restricted_float, required=True,
         help='If this value is given as positive float, the best sqs get written to \'best_sqs.out\'. For num_best < 1 the best 100*num_best %% of sqs are chosen, for num_best >= 1 the round(num_best) best sqs get selected.')
     parser.add_argument('-s', dest='sqs_file', type=str, default='sqs.out',
-        help='File to take sqs from when using -b option. Defaults to \'sqs.out\' if omitted.')
+        help='File to take sqs from when using -b option, a sqs output file or a collection (\'.npz\', see sqs_collection.py). Defaults to \'sqs.out\' if omitted.')
     parser.add_argument('-o', dest='output_file', type=str, default='best_sqs.out', required=False,
-        help='Name of output file to write best sqs to. Defaults to \'best_sqs.out\' if omitted.')
+        help='Name of output file to write best sqs to, stored as collection if ending with \'.npz\'. Defaults to \'best_sqs.out\' if omitted.')
+    parser.add_argument('-t', '--ties', dest='ties', action='store_true',
+        help='Additionally select all sqs with the same error as the last selected one.')
+    parser.add_argument('-k', '--keep-order', dest='keep_order', action='store_true',
+        help='Write the selected sqs in the order they appear in the sqs file instead of sorted by error.')
+    parser.add_argument('-u', '--unique', dest='unique', action='store_true',
+        help='Select the best distinct sqs, skipping duplicates of better ones (the same structure up to a translation or permutation of the sites, see duplicates.py).')
+    parser.add_argument('--unique-tol', dest='unique_tolerance', type=float, default=duplicates.DEFAULT_TOLERANCE,
+        help='Tolerance of the distances compared by -u in Angstroem. Defaults to {:g}.'.format(duplicates.DEFAULT_TOLERANCE))
+    timings.add_arguments(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    try:
+        if sqs_collection.is_collection(args.sqs_file):
+            # The sqs are taken from the arrays of the collection instead of being read and parsed.
+            with timer.stage('load') as stage:
+                collection = sqs_collection.SQSCollection.load(args.sqs_file)
+                stage.items = len(collection)
+            with timer.stage('select unique' if args.unique else 'select') as stage:
+                if args.unique:
+                    errors = np.concatenate([np.empty(0)]+list(read_errors(args.error_file, column=args.column)))
+                    check_count([len(errors)-1], len(collection), args.error_file, args.sqs_file)
+                    selected, index = select_unique_collection(errors, collection, args.num_best, args.ties, args.keep_order, args.unique_tolerance)
+                else:
+                    selected = select_from_file(args.error_file, args.num_best, args.ties, args.keep_order, column=args.column)
+                stage.items = len(selected)
+            check_count(selected, len(collection), args.error_file, args.sqs_file)
+            collection = collection.take(selected)
+            num_best = len(collection)
+        elif args.unique:
+            # All errors are needed, the sqs are then fingerprinted in order of their error until enough distinct ones have been found.
+            with timer.stage('index') as stage:
+                sqs_index = load_index(args.sqs_file)
+                stage.items = len(sqs_index)
+            with timer.stage('select unique') as stage:
+                errors = np.concatenate([np.empty(0)]+list(read_errors(args.error_file, column=args.column)))
+                check_count([len(errors)-1], len(sqs_index), args.error_file, args.sqs_file)
+                try:
+                    selected, blocks, index = select_unique(errors, args.sqs_file, sqs_index, args.num_best, args.ties, args.keep_order, args.unique_tolerance)
+                except StructureError as err:
+                    print("\n{}".format(err))
+                    sys.exit(-1)
+                stage.items = len(selected)+len(index.duplicates)
+            num_best = len(selected)
+        else:
+            # The errors are compared as numbers and streamed in chunks, only the best ones are kept in memory (see selection.py).
+            with timer.stage('select') as stage:
+                selected = select_from_file(args.error_file, args.num_best, args.ties, args.keep_order, column=args.column)
+                num_best = len(selected)
+                stage.items = num_best
 
-    num_best = 0
-    arg_best = args.num_best
-    if arg_best != 0:
-        if arg_best >= 1:
-            num_best = round(arg_best)
+            # The selected sqs are read directly from their position in the sqs file (see sqs_index.py).
+            with timer.stage('index') as stage:
+                sqs_index = load_index(args.sqs_file)
+                stage.items = len(sqs_index)
+            check_count(selected, len(sqs_index), args.error_file, args.sqs_file)
+            blocks = read_blocks(args.sqs_file, sqs_index, selected)
+    except ValueError as err:
+        # Malformed error file (see selection.read_errors).
+        print("\n{}\n".format(err))
+        sys.exit(-1)
+    with timer.stage('write') as stage:
+        if sqs_collection.is_collection(args.output_file):
+            if not sqs_collection.is_collection(args.sqs_file):
+                try:
+                    collection = sqs_collection.SQSCollection.from_blocks(zip([number+1 for number in selected], blocks))
+                except StructureError as err:
+                    print("\n{}".format(err))
+                    sys.exit(-1)
+            collection.save(args.output_file)
         else:
-            num_best = round(num_best*num_sqs)
-
-    error_list = open(args.error_file, 'r').readlines()
-    sqs_list = []
-    single_sqs = []
-    for line in open(args.sqs_file, 'r').readlines():
-        single_sqs.append(line)
-        if line.rstrip() == '':
-            sqs_list.append(single_sqs)
-            single_sqs = []
-
-    output_file = open(args.output_file, 'w')
-    for i in range(num_best):
-        index = error_list.index(min(error_list))
-        error_list.pop(index)
-        sqs_temp = sqs_list.pop(index)
-        for line in sqs_temp:
-            output_file.write(line)
-    output_file.close()
+            output_file = open(args.output_file, 'w')
+            if sqs_collection.is_collection(args.sqs_file):
+                for i in range(len(collection)):
+                    output_file.write(collection.block_text(i))
+            else:
+                for block in blocks:
+                    output_file.write(block.text)
+            output_file.close()
+        stage.items = num_best
 
     print("\nThe best {} sqs have been saved to \'{}\'.\n".format(num_best, args.output_file))
+    if args.unique:
+        print("{} duplicates of better sqs skipped.\n".format(len(index.duplicates)))
+    timer.finish()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
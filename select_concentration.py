@@ -1,59 +1,117 @@
 #!/opt/local/bin/python
 import argparse             # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import os                   # Miscellaneous operating system interfaces (e.g. for manipulating file names).     https://docs.python.org/3/library/os.html
 import sys                  # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import time                 # Time access and conversions (for limiting the progress output).                   https://docs.python.org/3/library/time.html
 import numpy as np          # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from sqs_reader import read_sqs
+from sqs_index import load_index, read_blocks
+from composition import Condition, split_blocks
+import timings
 
-def main():
-    parser = argparse.ArgumentParser(description='Select and output sqs of desired concentration.')
+PROGRESS_INTERVAL = 0.2     # Minimum time in seconds between two updates of the progress output.
+
+def bucket_file_names(output_file_name, conditions):
+    # A single condition writes to the output file itself, several conditions to one file each, e.g. 'sqs_sel_Nb8_Ta16.out'.
+    # Conditions with the same tag (e.g. 'Nb=8' and 'Nb=8:8') get their number appended, e.g. 'sqs_sel_Nb8_1.out' and 'sqs_sel_Nb8_2.out'.
+    if len(conditions) == 1:
+        return [output_file_name]
+    root, ext = os.path.splitext(output_file_name)
+    tags = [condition.tag() for condition in conditions]
+    return [root+"_"+tag+("_"+str(i+1) if tags.count(tag) > 1 else "")+ext for i, tag in enumerate(tags)]
+
+def write_block(output_file, block):
+    for content in block.lines:
+        output_file.write(content+"\n")
+    output_file.write("\n")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Select and output sqs of desired concentration.')
 
     parser.add_argument('-i', dest='input_file', type=str, default='sqs.out', required=False,
         help='Name of input file. Defaults to \'sqs.out\' if omitted.')
-    parser.add_argument('-Nb', dest='num_nb', type=int, required=True,
-        help='Desired number of Nb atoms in sqs.')
-    parser.add_argument('-Ta', dest='num_ta', type=int, required=True,
-        help='Desired number of Ta atoms in sqs.')
+    parser.add_argument('-Nb', dest='num_nb', type=int, required=False,
+        help='Desired number of Nb atoms in sqs (together with -Ta, short for -w Nb=[num_nb],Ta=[num_ta]).')
+    parser.add_argument('-Ta', dest='num_ta', type=int, required=False,
+        help='Desired number of Ta atoms in sqs (together with -Nb, short for -w Nb=[num_nb],Ta=[num_ta]).')
+    parser.add_argument('-w', '--where', dest='conditions', type=str, action='append', default=[], required=False,
+        help='Desired composition, e.g. \'Nb=8,Ta=16\', or ranges like \'Nb=4:8\', \'Nb=4:\' or \'Ta=:10\'. '
+        'May be given several times, every sqs is then written to the output file of each composition it matches (all in a single pass over the input file).')
     parser.add_argument('-o', dest='output_file', type=str, default='sqs_sel.out', required=False,
-        help='Name of output file. Defaults to \'sqs_sel.out\' if omitted.')
+        help='Name of output file. Defaults to \'sqs_sel.out\' if omitted. With several compositions the composition is appended to the name, e.g. \'sqs_sel_Nb8_Ta16.out\'.')
+    parser.add_argument('-x', '--index', dest='use_index', action='store_true',
+        help='Select the sqs by means of the index file (e.g. \'sqs.out.idx\', created or updated if necessary) instead of reading all of them.')
+    timings.add_arguments(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
 
-    num_nb = args.num_nb
-    num_ta = args.num_ta
+    if (args.num_nb is None) != (args.num_ta is None):
+        print("\nThe options -Nb and -Ta have to be given together.")
+        sys.exit(-1)
+    texts = list(args.conditions)
+    if args.num_nb is not None:
+        texts.insert(0, "Nb={},Ta={}".format(args.num_nb, args.num_ta))
+    if not texts:
+        print("\nNo composition given (use -Nb and -Ta, or -w).")
+        sys.exit(-1)
+    try:
+        conditions = [Condition(text) for text in texts]
+    except ValueError as valerr:
+        print("\n{}".format(valerr))
+        sys.exit(-1)
 
-    input_file = [line.rstrip() for line in open(args.input_file, 'r').readlines()]
-    output_file = open(args.output_file, 'w')
+    output_file_names = bucket_file_names(args.output_file, conditions)
+    output_files = [open(output_file_name, 'w') for output_file_name in output_file_names]
 
     count_sqs = 0
-    count_matches = 0
+    count_matches = [0]*len(conditions)
 
     print("\n")
 
-    structure = []
-    nb_count = 0
-    ta_count = 0
     num_backspace = 1
-    sys.stdout.write("%s" %count_matches)
+    sys.stdout.write("%s" %0)
     sys.stdout.flush()
-    for line in input_file:
-        nb_count += line.count('Nb')
-        ta_count += line.count('Ta')
-        structure.append(line)
-        if line == '':
-            count_sqs += 1
-            if nb_count == num_nb and ta_count == num_ta:
-                count_matches += 1
-                for content in structure:
-                    output_file.write(content+"\n")
-                if count_matches > 1:
-                    num_backspace=int(np.floor(np.log10(count_matches-1))+1)
-                sys.stdout.write("\b"*num_backspace+"%s" %count_matches)
+    last_update = time.monotonic()
+    if args.use_index:
+        # Only the matching sqs are read, directly from their position in the input file (see sqs_index.py).
+        with timer.stage('index') as stage:
+            sqs_index = load_index(args.input_file)
+            count_sqs = len(sqs_index)
+            masks = np.array([condition.mask(sqs_index) for condition in conditions]).reshape((len(conditions), -1))
+            selected = np.flatnonzero(masks.any(axis=0))
+            stage.items = count_sqs
+        matched = ((block, list(np.flatnonzero(masks[:,i]))) for i, block in zip(selected, read_blocks(args.input_file, sqs_index, selected)))
+    else:
+        # The sqs are read one at a time, so the input file is never held in memory as a whole.
+        matched = split_blocks(read_sqs(args.input_file), conditions)
+    with timer.stage('filter and write') as stage:
+        for block, buckets in matched:
+            if not args.use_index:
+                count_sqs += 1
+            for bucket in buckets:
+                count_matches[bucket] += 1
+                write_block(output_files[bucket], block)
+            # Live count of the matching sqs, updated at most every PROGRESS_INTERVAL seconds:
+            if buckets and time.monotonic()-last_update >= PROGRESS_INTERVAL:
+                sys.stdout.write("\b"*num_backspace+"%s" %sum(count_matches))
                 sys.stdout.flush()
-            structure = []
-            nb_count = 0
-            ta_count = 0
-    output_file.close()
+                num_backspace = len(str(sum(count_matches)))
+                last_update = time.monotonic()
+        sys.stdout.write("\b"*num_backspace+"%s" %sum(count_matches))
+        sys.stdout.flush()
+        for output_file in output_files:
+            output_file.close()
+        stage.items = count_sqs
 
-    print(" of the {} provided structures had {} Nb and {} Ta atoms. They were saved to \'{}\'.\n".format(count_sqs, num_nb, num_ta, args.output_file))
+    if args.num_nb is not None and len(conditions) == 1:
+        print(" of the {} provided structures had {} Nb and {} Ta atoms. They were saved to \'{}\'.\n".format(count_sqs, args.num_nb, args.num_ta, args.output_file))
+    else:
+        print(" matches within the {} provided structures:".format(count_sqs))
+        for condition, count, output_file_name in zip(conditions, count_matches, output_file_names):
+            print("    {:>8d} with {}, saved to \'{}\'.".format(count, condition.text, output_file_name))
+        print("")
+    timer.finish()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,104 @@
+import itertools        # Functions creating iterators for efficient looping (for reading in chunks).       https://docs.python.org/3/library/itertools.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+
+# Selection of the best (lowest error) sqs.
+# Instead of repeatedly searching the minimum of the whole list, the candidates are partitioned with np.argpartition,
+# which only takes linear time. Errors may be fed in chunks (e.g. while streaming through errors.out),
+# only the best num_best candidates seen so far are kept in memory.
+#
+# Candidates with equal errors are ordered by their position in the input (stable ordering).
+
+def num_selected(num_best, num_sqs):
+    # For num_best < 1 the best 100*num_best % of sqs are chosen, for num_best >= 1 the round(num_best) best sqs get selected.
+    if num_best < 1:
+        return min(round(num_best*num_sqs), num_sqs)
+    return min(round(num_best), num_sqs)
+
+def best_of(errors, indices, num_best, ties=False):
+    # Returns the errors and indices of the num_best lowest errors, sorted by error (and index for equal errors).
+    # If ties is True, all candidates with the same error as the last selected one are kept as well.
+    if num_best <= 0 or len(errors) == 0:
+        return errors[:0], indices[:0]
+    if len(errors) > num_best:
+        threshold = errors[np.argpartition(errors, num_best-1)[num_best-1]]
+        keep = errors <= threshold
+        errors, indices = errors[keep], indices[keep]
+    order = np.lexsort((indices, errors))
+    if not ties:
+        order = order[:num_best]
+    return errors[order], indices[order]
+
+
+class RunningTopK:
+    def __init__(self, num_best, ties=False):
+        self.num_best = num_best
+        self.ties = ties
+        self.errors = np.empty(0)
+        self.indices = np.empty(0, dtype=np.int64)
+        self.count = 0                                  # Number of candidates seen so far.
+
+    # Adds a chunk of errors, the candidates get numbered consecutively in the order they are added.
+    def add(self, errors):
+        errors = np.asarray(errors, dtype=float).ravel()
+        indices = np.arange(self.count, self.count+len(errors), dtype=np.int64)
+        self.count += len(errors)
+        errors, indices = best_of(errors, indices, self.num_best, self.ties)
+        self.errors, self.indices = best_of(np.concatenate((self.errors, errors)), np.concatenate((self.indices, indices)), self.num_best, self.ties)
+
+    # Indices of the selected candidates, either ranked (best first) or in their original order.
+    def result(self, keep_order=False):
+        if keep_order:
+            return np.sort(self.indices)
+        return self.indices.copy()
+
+    # Selected candidates and number of candidates seen as plain lists (e.g. for saving as JSON), and the reverse.
+    def to_dict(self):
+        return {'errors': self.errors.tolist(), 'indices': self.indices.tolist(), 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, num_best, ties, values):
+        top_k = cls(num_best, ties)
+        top_k.errors = np.array(values['errors'], dtype=float)
+        top_k.indices = np.array(values['indices'], dtype=np.int64)
+        top_k.count = values['count']
+        return top_k
+
+
+def select_best(errors, num_best, ties=False, keep_order=False):
+    # Indices of the best sqs for a complete array of errors. num_best is interpreted as in num_selected.
+    errors = np.asarray(errors, dtype=float).ravel()
+    top_k = RunningTopK(num_selected(num_best, len(errors)), ties)
+    top_k.add(errors)
+    return top_k.result(keep_order)
+
+def read_errors(file_name, chunk_size=100000, column=0):
+    # Generator yielding the errors of the given file (one sqs per line, the errors of several damping constants as columns)
+    # of the given column (counted from 0) as arrays of at most chunk_size values. Raises ValueError for lines without a number in that column.
+    with open(file_name, 'r') as input_file:
+        line_number = 0
+        while True:
+            lines = list(itertools.islice(input_file, chunk_size))
+            if not lines:
+                return
+            errors = []
+            for line_number, line in enumerate(lines, line_number+1):
+                if line.strip() == '':
+                    continue
+                try:
+                    errors.append(float(line.split()[column]))
+                except (ValueError, IndexError):
+                    raise ValueError("Line {} of \'{}\' has no error in column {} (counted from 0): {}".format(line_number, file_name, column, line.strip()))
+            yield np.array(errors)
+
+def count_lines(file_name):
+    with open(file_name, 'rb') as input_file:
+        return sum(1 for line in input_file if line.strip() != b'')
+
+def select_from_file(file_name, num_best, ties=False, keep_order=False, chunk_size=100000, column=0):
+    # Indices of the best sqs for (the given column of) an error file, which is streamed in chunks (the file is counted first if num_best < 1).
+    if num_best < 1:
+        num_best = num_selected(num_best, count_lines(file_name))
+    top_k = RunningTopK(round(num_best), ties)
+    for errors in read_errors(file_name, chunk_size, column):
+        top_k.add(errors)
+    return top_k.result(keep_order)
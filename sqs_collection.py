@@ -0,0 +1,242 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from sqs_reader import read_sqs
+from sqs_index import load_index, read_blocks
+from sqs_structure import StructureError, poscar_text, run_batches
+import duplicates
+import timings
+
+# Compact representation of many parsed SQS (e.g. all of sqs.out) as a few contiguous arrays instead of one object per structure or atom:
+#
+#     species   (T,)        names of the atom types, in order of first appearance
+#     lattices  (S,3,3)     lattice vectors of every SQS (rows, cartesian)
+#     positions (N,3)       cartesian coordinates of the atoms of all SQS, one SQS after another (in the order of the input file)
+#     codes     (N,)        atom type of every atom as uint8 (index into species)
+#     offsets   (S+1,)      atoms of SQS i: positions[offsets[i]:offsets[i+1]]
+#     numbers   (S,)        number of every SQS within the file it was read from (counted from 1)
+#
+# which takes 25 bytes per atom. Selections are taken with vectorized indexing (take), compositions are counted for all SQS at once (counts,
+# compatible with composition.Condition.mask), and single SQS are handed to poscar_text and the analysis as light views (structure).
+# Collections are stored as uncompressed NumPy archives (.npz):
+#
+#     sqs_collection.py -i sqs.out -o sqs.npz
+#     atat_poscar.py -i sqs.npz -s 3 7
+#     select_best.py -e errors.out -b 10 -s sqs.npz -o best_sqs.npz
+#     neighbors.py best_sqs.npz -r 3.5 6.5 -p Nb O
+
+SUFFIX = ".npz"
+ARRAYS = ['species', 'lattices', 'positions', 'codes', 'offsets', 'numbers']
+
+def is_collection(file_name):
+    return file_name.endswith(SUFFIX)
+
+def parse_block(lines, number):
+    # Cartesian lattice vectors (rows), cartesian atom positions (rows) and atom types of the lines of a single SQS block.
+    # Same interpretation as sqs_structure.Structure; raises StructureError for malformed SQS.
+    try:
+        coordinate_system = np.array([vectors.split()[:3] for vectors in lines[0:3]], dtype=float)
+        lattice = np.array([vectors.split()[:3] for vectors in lines[3:6]], dtype=float) @ coordinate_system
+        atom_lines = [line for line in lines[6:] if line != 'end']
+        # Usually every atom line has exactly four fields, which are then split all at once.
+        fields = " ".join(atom_lines).split()
+        if len(fields) == 4*len(atom_lines):
+            fields = np.array(fields).reshape((-1, 4))
+            coords, atom_types = fields[:, :3].astype(float), fields[:, 3]
+        else:
+            atom_lines = [line.split() for line in atom_lines]
+            coords = np.array([atom_info[:3] for atom_info in atom_lines], dtype=float).reshape((-1, 3))
+            atom_types = np.array([atom_info[-1] for atom_info in atom_lines])
+    except (ValueError, IndexError) as err:
+        raise StructureError(number, err) from err
+    if lattice.shape != (3, 3):
+        raise StructureError(number, "Expected three lines of the coordinate system and three lines of the lattice vectors.")
+    return lattice, coords @ coordinate_system, atom_types
+
+
+class CollectionStructure:
+    # Single SQS of a collection, with the attributes of sqs_structure.Structure used by poscar_text and duplicates.structure_atoms.
+    # The atoms are sorted by atom type like in sqs_structure.Structure (in the order of atom_list, if given). Raises StructureError.
+    def __init__(self, collection, i, atom_list=None):
+        self.number = int(collection.numbers[i])
+        self.lattice_vectors_car = collection.lattices[i]
+        codes = collection.codes[collection.offsets[i]:collection.offsets[i+1]]
+        present = list(dict.fromkeys(codes.tolist()))              # Codes in order of first appearance within this SQS.
+        self.atom_types = [collection.species[code] for code in present]
+        if atom_list is not None:
+            if len(self.atom_types) != len(atom_list):
+                raise StructureError(self.number, "Length of order specification is different from number of atom types found in input file.")
+            missing = [atom_type for atom_type in self.atom_types if atom_type not in atom_list]
+            if missing:
+                raise StructureError(self.number, "Atom type {!r} found in input file is missing in the order specification.".format(missing[0]))
+            self.atom_types = list(atom_list)
+            present = [collection.species.index(atom_type) for atom_type in atom_list]
+        rank = np.zeros(len(collection.species), dtype=np.intp)
+        rank[present] = np.arange(len(present))
+        order = np.argsort(rank[codes], kind='stable')
+        self.atom_numbers = np.bincount(rank[codes], minlength=len(present)).tolist()
+        self._coords_car = collection.positions[collection.offsets[i]:collection.offsets[i+1]][order]
+
+    def coords_car(self):
+        return self._coords_car
+
+    def coords_dir(self):
+        return self._coords_car @ np.linalg.inv(self.lattice_vectors_car)
+
+
+class SQSCollection:
+    def __init__(self, species, lattices, positions, codes, offsets, numbers):
+        self.species = [str(name) for name in species]
+        self.lattices = np.asarray(lattices, dtype=float).reshape((-1, 3, 3))
+        self.positions = np.asarray(positions, dtype=float).reshape((-1, 3))
+        self.codes = np.asarray(codes, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.numbers = np.asarray(numbers, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.lattices)
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        # Collection of the given (number, SQSBlock) pairs. Raises StructureError for malformed SQS and ValueError for more than 256 atom types.
+        species = {}                            # Atom type -> code.
+        lattices, positions, codes, numbers = [], [], [], []
+        for number, block in blocks:
+            lattice, coords, atom_types = parse_block(block.lines, number)
+            names, inverse = np.unique(atom_types, return_inverse=True)
+            for name in atom_types[np.sort(np.unique(inverse, return_index=True)[1])].tolist():
+                species.setdefault(name, len(species))              # In order of first appearance.
+            if len(species) > 256:
+                raise ValueError("More than 256 atom types, the atom types are stored as uint8.")
+            lattices.append(lattice)
+            positions.append(coords)
+            codes.append(np.array([species[name] for name in names.tolist()], dtype=np.uint8)[inverse.ravel()])
+            numbers.append(number)
+        offsets = np.cumsum([0]+[len(coords) for coords in positions])
+        return cls(list(species), np.array(lattices).reshape((-1, 3, 3)), np.concatenate([np.empty((0, 3))]+positions),
+            np.concatenate([np.empty(0, dtype=np.uint8)]+codes), offsets, numbers)
+
+    @classmethod
+    def from_file(cls, file_name, sqs_numbers=None):
+        # Collection of all SQS of a file like sqs.out, or of the given ones (counted from 1, read directly by means of the index).
+        if sqs_numbers is None:
+            return cls.from_blocks(enumerate(read_sqs(file_name), 1))
+        sqs_index = load_index(file_name)
+        if min(sqs_numbers) < 1 or max(sqs_numbers) > len(sqs_index):
+            raise ValueError("SQS numbers have to be between 1 and {} (number of SQS in {}).".format(len(sqs_index), file_name))
+        return cls.from_blocks(zip(sqs_numbers, read_blocks(file_name, sqs_index, [number-1 for number in sqs_numbers])))
+
+    @classmethod
+    def load(cls, file_name):
+        with np.load(file_name, allow_pickle=False) as archive:
+            return cls(*[archive[name] for name in ARRAYS])
+
+    def save(self, file_name):
+        # Written to a temporary file first, so an interrupted write does not leave a broken collection behind.
+        with open(file_name+".tmp", 'wb') as output_file:
+            np.savez(output_file, species=np.array(self.species, dtype=str), lattices=self.lattices, positions=self.positions,
+                codes=self.codes, offsets=self.offsets, numbers=self.numbers)
+        os.replace(file_name+".tmp", file_name)
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS[1:])
+
+    def num_atoms(self):
+        return np.diff(self.offsets)
+
+    def take(self, indices):
+        # Collection of the given SQS (indices within this collection, in the given order).
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        starts, lengths = self.offsets[indices], self.offsets[indices+1]-self.offsets[indices]
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        atoms = np.repeat(starts-offsets[:-1], lengths)+np.arange(offsets[-1])
+        return SQSCollection(self.species, self.lattices[indices], self.positions[atoms], self.codes[atoms], offsets, self.numbers[indices])
+
+    def composition(self):
+        # Number of atoms of each type (columns in the order of species) in every SQS, as (S,T) array.
+        owners = np.repeat(np.arange(len(self)), self.num_atoms())
+        return np.bincount(owners*len(self.species)+self.codes, minlength=len(self)*len(self.species)).reshape((len(self), len(self.species)))
+
+    # Number of atoms of the given type in every SQS (like SQSIndex.counts, so composition.Condition.mask accepts collections, too).
+    def counts(self, atom_type):
+        if atom_type not in self.species:
+            return np.zeros(len(self), dtype=int)
+        return np.bincount(np.repeat(np.arange(len(self)), self.num_atoms())[self.codes == self.species.index(atom_type)], minlength=len(self))
+
+    def volumes(self):
+        return abs(np.linalg.det(self.lattices))
+
+    def atoms(self, i):
+        # Cartesian positions and atom types (as array of names) of SQS i, in the order of the input file.
+        return self.positions[self.offsets[i]:self.offsets[i+1]], np.array(self.species)[self.codes[self.offsets[i]:self.offsets[i+1]]]
+
+    def structure(self, i, atom_list=None):
+        return CollectionStructure(self, i, atom_list)
+
+    def block_text(self, i):
+        # SQS i in the format of sqs.out (cartesian coordinate system, so the lattice vectors and positions are written as stored).
+        coords, atom_types = self.atoms(i)
+        lines = ["{:.6f} {:.6f} {:.6f}".format(*row) for row in np.eye(3).tolist()]
+        lines += ["{!r} {!r} {!r}".format(*row) for row in self.lattices[i].tolist()]
+        lines += ["{!r} {!r} {!r} {}".format(*row, atom_type) for row, atom_type in zip(coords.tolist(), atom_types.tolist())]
+        return "\n".join(lines+["end", "", ""])
+
+
+def unique_indices(collection, index, tolerance=duplicates.DEFAULT_TOLERANCE, numbers=None):
+    # Indices of the SQS that are no duplicates of SQS seen before (in index, see duplicates.py, under the given numbers or collection.numbers).
+    numbers = collection.numbers.tolist() if numbers is None else list(numbers)
+    keep = []
+    for i in range(len(collection)):
+        coords, atom_types = collection.atoms(i)
+        if index.add(collection.lattices[i], coords, atom_types.tolist(), numbers[i], tolerance):
+            keep.append(i)
+    return keep
+
+def convert_batch(collection, numbers, atom_list, name, representation):
+    # (number, text of the POSCAR file) of every SQS of a (partial) collection. Run by the worker processes.
+    return [(number, poscar_text(collection.structure(i, atom_list), name, number, representation)) for i, number in enumerate(numbers)]
+
+def convert_collection(collection, atom_list, name, representation, output, jobs=1, numbers=None, batch_size=64):
+    # Converts all SQS of the collection to POSCAR files written to output (see poscar_output.py), numbered by the given numbers
+    # or by their position in the collection (counted from 1, like the SQS of a text file converted by atat_poscar.convert_sqs).
+    # Yields the number of converted SQS after each batch. The workers (see sqs_structure.run_batches) get compact sub-collections of batch_size SQS.
+    numbers = list(range(1, len(collection)+1)) if numbers is None else list(numbers)
+    batches = ((collection.take(np.arange(start, min(start+batch_size, len(collection)))), numbers[start:start+batch_size], atom_list, name, representation)
+        for start in range(0, len(collection), batch_size))
+    return run_batches(convert_batch, batches, output, jobs)
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Parse a SQS output file (e.g. sqs.out) once and store all its SQS as a compact collection (.npz).')
+    parser.add_argument('-i', '--ifile', dest='file_name', type=str, default='sqs.out', required=False,
+        help='Name of input file. Defaults to \'sqs.out\'.')
+    parser.add_argument('-o', dest='output_file', type=str, default=None, required=False,
+        help='Name of the collection file. Defaults to the name of the input file with \'{}\' appended (e.g. \'sqs.out{}\').'.format(SUFFIX, SUFFIX))
+    parser.add_argument('-s', '--select', nargs='+', type=int, dest='sqs_numbers', default=None, required=False,
+        help='Numbers of the SQS to store (counted from 1 in order of appearance in the input file). All SQS are stored if omitted.')
+    timings.add_arguments(parser)
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+    output_file = args.output_file or args.file_name+SUFFIX
+
+    if is_collection(args.file_name):
+        print("\n\'{}\' already is a collection.\n".format(args.file_name))
+        sys.exit(-1)
+    with timer.stage('parse') as stage:
+        try:
+            collection = SQSCollection.from_file(args.file_name, args.sqs_numbers)
+        except (OSError, ValueError) as err:
+            print("\n{}\n".format(err))
+            sys.exit(-1)
+        stage.items = len(collection)
+    with timer.stage('save') as stage:
+        collection.save(output_file)
+        stage.items = len(collection)
+
+    print("\n{} SQS ({} atoms, atom types: {}) saved to \'{}\' ({:.1f} MB of arrays).\n".format(len(collection), len(collection.positions),
+        " ".join(collection.species), output_file, collection.nbytes()/1e6))
+    timer.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import mmap             # Memory-mapped file support (for reading single SQS without scanning the file).    https://docs.python.org/3/library/mmap.html
+import hashlib          # Secure hashes (used to recognise a file that has been rewritten).                 https://docs.python.org/3/library/hashlib.html
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from sqs_reader import SQSBlock, read_sqs
+
+# Sidecar index for files containing multiple SQS (e.g. sqs.out -> sqs.out.idx).
+# For every SQS the byte offset and length of its block within the file and the number of atoms of each type are stored,
+# so single SQS can be read directly (memory mapped) and filtered by composition without parsing the whole file.
+#
+# Index file format:
+#
+#     # sqs index [number of bytes indexed] [sha1 of the first indexed bytes]
+#     [offset] [length] [atom type]=[quantity],[atom type]=[quantity],...
+#     ...
+#
+# mcsqs keeps appending to sqs.out while it is running. If the file has grown since the index was written,
+# only the new SQS are indexed. If it has been rewritten (shorter, or different beginning), the index is rebuilt.
+
+HEAD_SIZE = 4096        # Number of bytes at the beginning of the file used to recognise it.
+
+def index_name(file_name):
+    return file_name+".idx"
+
+def head_hash(file_name, size):
+    with open(file_name, 'rb') as input_file:
+        return hashlib.sha1(input_file.read(min(size, HEAD_SIZE))).hexdigest()
+
+def fingerprint(atom_types):
+    counts = {}
+    for atom_type in atom_types:
+        counts[atom_type] = counts.get(atom_type, 0)+1
+    return ",".join("{}={}".format(atom_type, num) for atom_type, num in counts.items()) or "-"
+
+
+def parses(block):
+    # Whether the lines of a block make up a whole SQS: three lines of the coordinate system, three of the lattice vectors
+    # (three numbers each) and at least one atom line (three numbers and the atom type) after them.
+    lines = [line for line in block.lines if line != 'end']
+    try:
+        return len(lines) > 6 and all(len(line.split()) >= 3 and [float(val) for val in line.split()[:3]] for line in lines[:6]) and \
+            all(len(line.split()) >= 4 and [float(val) for val in line.split()[:3]] for line in lines[6:])
+    except ValueError:
+        return False
+
+
+class SQSIndex:
+    def __init__(self, offsets=(), lengths=(), fingerprints=(), size=0):
+        self.offsets = list(offsets)
+        self.lengths = list(lengths)
+        self.fingerprints = list(fingerprints)
+        self.size = size                        # Number of bytes of the sqs file covered by the index (end of the last complete SQS).
+        self.head = None
+        self.tail = False                       # True if the last entry is an unterminated SQS at the end of the file (not written to the sidecar).
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Number of atoms of the given type in every SQS.
+    def counts(self, atom_type):
+        counts = np.zeros(len(self), dtype=int)
+        for i, fingerprint in enumerate(self.fingerprints):
+            for entry in fingerprint.split(","):
+                name, num = entry.split("=") if entry != "-" else (None, 0)
+                if name == atom_type:
+                    counts[i] = int(num)
+        return counts
+
+    # Appends all complete SQS found after the end of the already indexed part of the file.
+    # With tail, an unterminated SQS at the end of the file (e.g. a single SQS without 'end') is appended as well if it parses fully.
+    # It is not counted in size, so it is indexed anew (and the sidecar keeps only the complete SQS) in case it is still being written.
+    def update(self, file_name, tail=True):
+        if self.tail:
+            self.offsets.pop()
+            self.lengths.pop()
+            self.fingerprints.pop()
+            self.tail = False
+        for block in read_sqs(file_name, self.size):
+            if not block.complete:
+                if tail and parses(block):
+                    self.offsets.append(block.offset)
+                    self.lengths.append(block.length)
+                    self.fingerprints.append(fingerprint(block.atom_types()))
+                    self.tail = True
+                break
+            self.offsets.append(block.offset)
+            self.lengths.append(block.length)
+            self.fingerprints.append(fingerprint(block.atom_types()))
+            self.size = block.offset+block.length
+        self.head = head_hash(file_name, self.size)
+
+    def write(self, output_file_name):
+        output_file = open(output_file_name, 'w')
+        output_file.write("# sqs index {} {}\n".format(self.size, self.head))
+        entries = list(zip(self.offsets, self.lengths, self.fingerprints))
+        output_file.write("".join("{} {} {}\n".format(*entry) for entry in (entries[:-1] if self.tail else entries)))
+        output_file.close()
+
+
+def read_index(index_file_name):
+    lines = open(index_file_name, 'r').read().splitlines()
+    header = lines[0].split()
+    entries = [line.split() for line in lines[1:]]
+    index = SQSIndex([int(entry[0]) for entry in entries], [int(entry[1]) for entry in entries], [entry[2] for entry in entries], int(header[3]))
+    index.head = header[4]
+    return index
+
+
+def load_index(file_name, tail=True):
+    # Returns the up-to-date index of the given sqs file, reading, extending or (re)building the sidecar file as necessary.
+    # Without tail, an unterminated SQS at the end of the file is left out (e.g. while mcsqs is still writing it, see SQSIndex.update).
+    index = None
+    try:
+        index = read_index(index_name(file_name))
+        if os.path.getsize(file_name) < index.size or head_hash(file_name, index.size) != index.head:
+            index = None                        # The file has been rewritten since it was indexed.
+    except (OSError, ValueError, IndexError):
+        index = None
+    if index is None:
+        index = SQSIndex()
+    size = index.size
+    index.update(file_name, tail)
+    if index.size != size or not os.path.isfile(index_name(file_name)):
+        try:
+            index.write(index_name(file_name))
+        except OSError:
+            pass                                # E.g. no write permission, the index is then only kept in memory.
+    return index
+
+
+def read_blocks(file_name, index, numbers):
+    # Yields the SQS with the given numbers (counted from 0 in order of appearance) in the given order as SQSBlock.
+    # The file is memory mapped, only the pages of the requested SQS are actually read.
+    with open(file_name, 'rb') as input_file:
+        if os.path.getsize(file_name) == 0:
+            return
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            for number in numbers:
+                offset = index.offsets[number]
+                yield SQSBlock([content[offset:offset+index.lengths[number]]], offset, True)
@@ -0,0 +1,89 @@
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import re               # Regular expression operations (for finding the end of each SQS).                  https://docs.python.org/3/library/re.html
+
+# Streaming reader for files containing multiple SQS (e.g. sqs.out written by mcsqs, or best_sqs.out).
+# Each SQS consists of the three lines of the coordinate system, the three lines of the lattice vectors and one line per atom.
+# It is terminated by a line containing 'end' and/or a blank line:
+#
+#     [coordinate system]
+#     [lattice vectors]
+#     [atom coordinates] [atom type]
+#     ...
+#     end
+#     (blank line)
+#
+# The file is read in chunks, so only a few MB of it are held in memory at any time.
+
+class SQSBlock:
+    def __init__(self, raw_lines, offset, complete):
+        self.text = b"".join(raw_lines).decode()                        # The block exactly as found in the file (including the terminating blank line).
+        self._lines = None
+        self.offset = offset                                            # Position of the first byte of the block within the file.
+        self.length = sum(len(line) for line in raw_lines)              # Number of bytes of the block (including the terminating blank line).
+        self.complete = complete                                        # False if the file ended before the block was terminated (e.g. mcsqs still writing).
+
+    # Lines of the structure, truncated space at end, without blank lines (split off the text on first use only).
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = [line.rstrip() for line in self.text.splitlines()]
+            while self._lines and self._lines[-1] == '':
+                self._lines.pop()
+        return self._lines
+
+    # Atom types of all atoms in the order of appearance (the last column of each atom line).
+    def atom_types(self):
+        atom_lines = self.lines[6:-1] if self.lines[-1] == 'end' else self.lines[6:]
+        return [line.split()[-1] for line in atom_lines]
+
+
+# Lines terminating a block: blank lines (only whitespace) and lines containing 'end' (with trailing whitespace at most).
+# The pattern matches the newline in front of such a line (which lets the regular expression engine skip ahead to the next newline),
+# group 1 is the terminating line itself.
+TERMINATOR = re.compile(rb'\n(?=((?:[ \t\r\x0b\x0c]*|end[ \t\r\x0b\x0c]*)(?:\n|\Z)))')
+
+CHUNK_SIZE = 1 << 22    # Number of bytes read at once.
+
+def read_sqs(file_name, offset=0, chunk_size=CHUNK_SIZE):
+    # Generator yielding the SQS of the given file one after another as SQSBlock.
+    # Reading may start at any byte offset at which a block begins (e.g. one recorded in SQSBlock.offset).
+    # The file is read in chunks, within which only the terminating lines get looked at (found by a regular expression),
+    # the atom lines are passed on to SQSBlock as a whole. A block consists of all lines from its first non-blank line up to
+    # and including the first blank line, or up to a line containing 'end' directly followed by the next structure.
+    file_name = os.path.abspath(file_name)
+    with open(file_name, 'rb') as input_file:
+        input_file.seek(offset)
+        buffer = b'\n'                          # Every line within the buffer is preceded by a newline (this one standing in for the line before offset).
+        base = offset-1                         # Position of buffer[0] within the file.
+        at_eof = False
+        while not at_eof:
+            data = input_file.read(chunk_size)
+            at_eof = not data
+            buffer += data
+            # Only complete lines are processed before the end of the file has been reached.
+            region_end = len(buffer) if at_eof else buffer.rfind(b'\n')+1
+            pos = 1                             # Start of the current block (or of the blank lines before it).
+            for match in TERMINATOR.finditer(buffer, 0, region_end):
+                line_start, line_end = match.span(1)
+                if line_start >= region_end:
+                    break
+                if match.group(1).rstrip() == b'':
+                    if line_start == pos:
+                        pos = line_end          # Blank line before any structure.
+                    else:
+                        yield SQSBlock([buffer[pos:line_end]], base+pos, True)
+                        pos = line_end
+                    continue
+                # 'end': the block ends here if the next line belongs to the next structure (not blank).
+                if line_end >= region_end:
+                    break                       # Next line not read yet.
+                next_end = buffer.find(b'\n', line_end, region_end)
+                if buffer[line_end:next_end if next_end >= 0 else region_end].rstrip() != b'':
+                    yield SQSBlock([buffer[pos:line_end]], base+pos, True)
+                    pos = line_end
+            if at_eof:
+                if buffer[pos:].strip():
+                    yield SQSBlock([buffer[pos:]], base+pos, buffer[pos:].rstrip().rsplit(b'\n', 1)[-1].rstrip() == b'end')
+                break
+            buffer = buffer[pos-1:]
+            base += pos-1
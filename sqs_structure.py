@@ -0,0 +1,137 @@
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from concurrent.futures import ProcessPoolExecutor      # Pool of worker processes.                         https://docs.python.org/3/library/concurrent.futures.html
+import poscar_output
+
+# A single SQS (given the lines of its block in a SQS output file like sqs.out) and its conversion to a VASP POSCAR file,
+# plus the distribution of the conversion of many SQS over worker processes.
+# Used by atat_poscar.py, sqs_collection.py, select_best.py, watch_sqs.py and aggregate_runs.py.
+
+class StructureError(ValueError):
+    # Malformed SQS (or atom types not matching the order specification), raised by Structure.
+    def __init__(self, number, message):
+        super().__init__(number, str(message))                 # Both arguments kept, so the error can be passed on by the worker processes.
+        self.number = number
+        self.message = str(message)
+
+    def __str__(self):
+        return "Error while reading SQS {}: {}".format(self.number, self.message)
+
+class Structure:
+    # Atom positions and lattice of a single SQS, given the lines of its block in the SQS output file. Raises StructureError for malformed SQS.
+    def __init__(self, data, atom_list, number=None):
+        try:                                            
+            self.data = data
+            self.number = number                # Number of the SQS within the input file (only used for messages).
+            pos = 0
+            # The first three lines describe the coordinate system used, the vectors (defined by the lines) make up the rows of the matrix:
+            self.coordinate_system = np.array([vectors.split()[:3] for vectors in self.data[pos:pos+3]], dtype=float)
+            pos += 3
+            # The following three lines describe the lattice vectors of the unit cell:
+            # The unit cell is expanded in most cases, therefore this generally not the identity matrix.
+            self.lattice_vectors_org = np.array([vectors.split()[:3] for vectors in self.data[pos:pos+3]], dtype=float)
+            pos += 3
+            self.lattice_vectors_car = self.lattice_vectors_org @ self.coordinate_system
+            
+            # Read in all the atoms (without the terminating 'end'): one row of coordinates per atom plus the atom type.
+            atom_lines = [line.split() for line in self.data[pos:] if line != 'end']
+            atom_types_unsorted = [atom_info[-1] for atom_info in atom_lines]
+            coords_unsorted = np.array([atom_info[:3] for atom_info in atom_lines], dtype=float).reshape((-1, 3))
+
+            # Determine the atom types present (in order of first appearance, so the order is the same in every run).
+            self.atom_types = list(dict.fromkeys(atom_types_unsorted))
+            if atom_list is not None:
+                if len(self.atom_types) == len(atom_list):
+                    self.atom_types = list(atom_list)
+                else: raise ValueError("Length of order specification is different from number of atom types found in input file.")
+
+            # Getting the list of atoms in the right order (VASP needs this):
+            # every atom gets the position of its type in self.atom_types as code, a stable sort by code then groups the atoms by type
+            # while keeping their order within each type.
+            type_index = {atom_type: i for i, atom_type in enumerate(self.atom_types)}
+            try:
+                codes = np.array([type_index[atom_type] for atom_type in atom_types_unsorted], dtype=np.intp)
+            except KeyError as keyerr:
+                raise ValueError("Atom type {} found in input file is missing in the order specification.".format(keyerr))
+            self.atom_numbers = np.bincount(codes, minlength=len(self.atom_types)).tolist()
+            order = np.argsort(codes, kind='stable')
+            # All atom positions in original coordinates, one row per atom, sorted by atom type.
+            self.coords_org = coords_unsorted[order]
+
+        except (ValueError, IndexError) as err:
+            raise StructureError(number, err) from err
+
+    # Transformation of the original coordinates of all atoms to cartesian or direct, one row per atom.
+    # With the coordinates stored as rows, x_car = C^T x_org becomes X_car = X_org C, and x_dir = (L^T)^-1 x_car becomes X_dir = X_car L^-1.
+    # The inverse of the lattice is thus computed once per structure instead of once per atom.
+    def coords_car(self):
+        return self.coords_org @ self.coordinate_system
+
+    def coords_dir(self):
+        return self.coords_car() @ np.linalg.inv(self.lattice_vectors_car)
+
+
+def poscar_text(structure, name, number, representation):
+    # For the exact format, check the VASP manual on POSCAR files: https://www.vasp.at/wiki/index.php/POSCAR
+    lines = [name+" (SQS number "+str(number)+")"]                                                                     # Name of structure (comment).
+    lines.append(" 1.0")                                                                                                # Scaling factor.
+    for i in range(3):
+        lines.append(" "+("  {:12.8f}"*3).format(*[structure.lattice_vectors_car[i,j] for j in range(3)]))               # Three vectors describing the lattice.
+    lines.append(" "+("  {:<4s}"*len(structure.atom_types)).format(*structure.atom_types))                               # Atom types in order of appearance.
+    lines.append(" "+("  {:>4d}"*len(structure.atom_numbers)).format(*structure.atom_numbers))                           # Corresponding quantities.
+
+    if representation in ['car', 'cartesian']:
+        lines.append("Cartesian")               # With this tag present the atom positions get read in cartesian coordinates.
+        coords = structure.coords_car()
+    else:
+        lines.append("Direct")                  # With this tag present the atom positions get read in the coordinates defined by the lattice vectors.
+        coords = structure.coords_dir()
+    row_format = " "+("  {:20.16f}"*3)
+    lines += [row_format.format(*row) for row in coords.tolist()]
+    return "\n".join(lines)+"\n"
+
+def printPOSCAR(structure, name, representation, number, output_dir):
+    # Writes the POSCAR file of the structure to [output_dir]/poscar_[number]/POSCAR with a single write.
+    poscar_output.write_directory(output_dir, number, poscar_text(structure, name, number, representation))
+
+def convert_batch(batch, atom_list, name, representation, output_dir=None):
+    # Converts a list of (number, lines) of SQS to POSCAR files. Run by the worker processes.
+    # If output_dir is given, the POSCAR files are written there directly (one directory per SQS) and (number, None) is returned for each SQS,
+    # otherwise (number, text of the POSCAR file) is returned for each SQS, to be written by the main process.
+    results = []
+    for number, lines in batch:
+        structure = Structure(lines, atom_list, number)
+        if output_dir is not None:
+            printPOSCAR(structure, name, representation, number, output_dir)
+            results.append((number, None))
+        else:
+            results.append((number, poscar_text(structure, name, number, representation)))
+    return results
+
+def run_batches(convert, batches, output, jobs=1):
+    # Runs convert(*arguments) for the argument tuples of batches, every call returning a list of (number, text of the POSCAR file, or None
+    # if it has been written by convert already), and writes the texts to output (see poscar_output.py) in input order.
+    # Yields the number of converted SQS after each batch. With jobs > 1 the batches are distributed over a pool of worker processes
+    # (convert has to be a function of a module). At most 2*jobs batches are pending at any time, so the input is still read lazily.
+    count = 0
+    if jobs <= 1:
+        for arguments in batches:
+            count += store(convert(*arguments), output)
+            yield count
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = []
+        for arguments in batches:
+            pending.append(pool.submit(convert, *arguments))
+            if len(pending) >= 2*jobs:
+                count += store(pending.pop(0).result(), output)
+                yield count
+        for future in pending:
+            count += store(future.result(), output)
+            yield count
+
+def store(results, output):
+    # Writes the POSCAR files returned by a conversion function like convert_batch (if not yet written), returns their number.
+    for number, text in results:
+        if text is not None:
+            output.write(number, text)
+    return len(results)
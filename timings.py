@@ -0,0 +1,111 @@
+import sys              # System-specific parameters and functions (the report is written to stderr).        https://docs.python.org/3/library/sys.html
+import time             # Time access and conversions (for timing the stages).                              https://docs.python.org/3/library/time.html
+import resource         # Resource usage information (for the peak memory).                                 https://docs.python.org/3/library/resource.html
+
+# Instrumentation shared by the command line scripts: --timings reports wall time, number of items, items per second,
+# bytes read and written and peak memory (maximum resident set size) of every stage of a run, --profile [file] additionally
+# dumps cProfile statistics (to be viewed with e.g. 'python -m pstats profile.out' or snakeviz).
+#
+#     timings = Timings.from_args(args)
+#     with timings.stage('read') as stage:
+#         ...
+#         stage.items = num_sqs
+#     timings.finish()
+#
+# Bytes read and written are taken from /proc/self/io (Linux only, all reads and writes of the process, not of worker processes).
+# Without --timings and --profile, stage() returns a shared do-nothing object, so the instrumented code runs as before.
+
+def add_arguments(parser):
+    parser.add_argument('--timings', dest='timings', action='store_true',
+        help='Report wall time, items per second, bytes read and written and peak memory of every stage of the run (written to stderr).')
+    parser.add_argument('--profile', dest='profile_file', type=str, nargs='?', const='profile.out', default=None,
+        help='Run with cProfile and save the statistics to the given file (defaults to \'profile.out\'). Implies --timings.')
+
+def io_counters():
+    # Bytes read and written by this process so far, None if not available.
+    try:
+        with open('/proc/self/io', 'r') as io_file:
+            counters = dict(line.split(': ') for line in io_file.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak/1e6 if sys.platform == 'darwin' else peak/1e3                # Bytes on macOS, kilobytes elsewhere.
+
+
+class NullStage:
+    # Stage of disabled instrumentation: does nothing, accepts items.
+    items = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+    def __init__(self, timings, name, items=None):
+        self.timings = timings
+        self.name = name
+        self.items = items                      # Number of items processed within the stage (set by the instrumented code).
+
+    def __enter__(self):
+        self.io = io_counters()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall = time.perf_counter()-self.start
+        io = io_counters()
+        self.bytes_read, self.bytes_written = (io[0]-self.io[0], io[1]-self.io[1]) if io and self.io else (None, None)
+        self.peak_rss = peak_rss_mb()
+        self.timings.stages.append(self)
+        return False
+
+
+class Timings:
+    def __init__(self, enabled=False, profile_file=None):
+        self.enabled = enabled or profile_file is not None
+        self.profile_file = profile_file
+        self.stages = []
+        self.profiler = None
+        self.start = time.perf_counter()
+        if profile_file is not None:
+            import cProfile                     # Only imported when profiling.
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(getattr(args, 'timings', False), getattr(args, 'profile_file', None))
+
+    def stage(self, name, items=None):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, items)
+
+    def finish(self):
+        # Stops the profiler (saving its statistics) and writes the report of all stages to stderr.
+        if not self.enabled:
+            return
+        total = time.perf_counter()-self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_file)
+        write = sys.stderr.write
+        write("\nTimings:\n")
+        write("    {:<24s} {:>10s} {:>10s} {:>12s} {:>10s} {:>12s} {:>10s}\n".format('stage', 'wall [s]', 'items', 'items/s', 'read [MB]', 'written [MB]', 'RSS [MB]'))
+        for stage in self.stages:
+            items = "" if stage.items is None else "{:d}".format(stage.items)
+            rate = "" if stage.items is None or stage.wall == 0 else "{:.1f}".format(stage.items/stage.wall)
+            read = "" if stage.bytes_read is None else "{:.2f}".format(stage.bytes_read/1e6)
+            written = "" if stage.bytes_written is None else "{:.2f}".format(stage.bytes_written/1e6)
+            write("    {:<24s} {:>10.3f} {:>10s} {:>12s} {:>10s} {:>12s} {:>10.1f}\n".format(stage.name, stage.wall, items, rate, read, written, stage.peak_rss))
+        write("    {:<24s} {:>10.3f} {:>10s} {:>12s} {:>10s} {:>12s} {:>10.1f}\n".format('total', total, "", "", "", "", peak_rss_mb()))
+        if self.profiler is not None:
+            write("cProfile statistics saved to \'{}\' (view with 'python -m pstats {}').\n".format(self.profile_file, self.profile_file))
@@ -0,0 +1,49 @@
+#!/opt/local/bin/python
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import itertools        # Functions creating iterators for efficient looping (for reading the header only). https://docs.python.org/3/library/itertools.html
+
+# Volume of the cell of POSCAR/CONTCAR files (like get_volume_POSCAR.py and get_volume_CONTCAR.py, but for any number of files).
+# Only the scaling factor and the lattice vectors are read, the 3x3 determinant is calculated in plain Python,
+# so the script does not need to import NumPy and starts quickly when called for single files many times.
+# For the cells of many files at once, batch_cells.py (volume, lattice constants and angles) is faster.
+
+def determinant(a, b, c):
+    return a[0]*(b[1]*c[2]-b[2]*c[1])+a[1]*(b[2]*c[0]-b[0]*c[2])+a[2]*(b[0]*c[1]-b[1]*c[0])
+
+def cell_volume(file_name):
+    # Volume of the cell in Angstroem^3. Raises OSError or ValueError for unreadable or malformed files.
+    with open(file_name, 'r') as input_file:
+        header = [line.split() for line in itertools.islice(input_file, 5)]
+    if len(header) < 5 or any(len(vector) < 3 for vector in header[2:5]):
+        raise ValueError("incomplete header.")
+    scale = [float(val) for val in header[1]]
+    vectors = [[float(val) for val in vector[:3]] for vector in header[2:5]]
+    volume = abs(determinant(*vectors))
+    if len(scale) == 1 and scale[0] < 0:
+        return -scale[0]                                                    # A negative scaling factor is the volume of the cell.
+    if len(scale) == 3:
+        return volume*abs(scale[0]*scale[1]*scale[2])                       # One scaling factor per cartesian axis.
+    if len(scale) == 1:
+        return volume*abs(scale[0])**3
+    raise ValueError("malformed scaling factor.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Print the volume of the cell of POSCAR/CONTCAR files.')
+    parser.add_argument('file_names', nargs='*', default=['POSCAR'],
+        help='Names of the input files. Defaults to \'POSCAR\'. With several files every volume is preceded by the file name.')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for file_name in args.file_names:
+        prefix = file_name+"\t" if len(args.file_names) > 1 else ""
+        try:
+            print(prefix+str(cell_volume(file_name)))
+        except (OSError, ValueError) as err:
+            print(prefix+"Volume not found: {}".format(err))
+            failed = True
+    if failed:
+        sys.exit(-1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/opt/local/bin/python
+import os               # Miscellaneous operating system interfaces (e.g. for manipulating directories).    https://docs.python.org/3/library/os.html
+import sys              # System-specific parameters and functions (e.g. for exiting after error).          https://docs.python.org/3/library/sys.html
+import json             # JSON encoder and decoder (for the saved state).                                   https://docs.python.org/3/library/json.html
+import time             # Time access and conversions (for waiting between two updates).                    https://docs.python.org/3/library/time.html
+import argparse         # Parser for command-line options, arguments and sub-commands.                      https://docs.python.org/3/library/argparse.html#module-argparse
+import numpy as np      # Fundamental package for scientific computing.                                     https://numpy.org/doc/stable/
+from sqs_index import load_index, read_blocks, head_hash
+from selection import RunningTopK
+from compare_correlations import read_clusters, cluster_weights, calc_errors, format_errors, damping_values, best_sqs_file_name
+from sqs_structure import Structure, StructureError, poscar_text
+import array_cache
+import poscar_output
+import timings
+
+# Incremental scoring of a running mcsqs job, which keeps appending to sqs.out and the correlation files.
+# Only the rows appended to the correlation files since the last update are parsed and scored: the byte offset up to which
+# each file has been consumed is saved in a state file (watch_state.json), together with the running top-k of the best sqs
+# (see selection.py) and the best sqs last written for each damping constant. Each update then takes time proportional
+# to the new rows, not to the size of the files.
+#
+# The errors of the new sqs are appended to the output file (errors.out, as written by compare_correlations.py), the best sqs
+# are written to best_sqs.out (or best_sqs_damp[d].out) whenever they change, and with -p new winners are converted to POSCAR files
+# (output_files/poscar_[number]/POSCAR) right away. With -w the files are checked again every given number of seconds until interrupted.
+#
+# Files that have been rewritten (shorter than the consumed part, or with a different beginning, e.g. after restarting mcsqs) and a changed
+# clusters file, structure file or damping constants start the scoring from scratch.
+
+STATE_FILE = "watch_state.json"
+OUTPUT_DIR = "output_files"
+STATE_VERSION = 2
+
+def complete_rows(file_name, offset):
+    # Non-blank complete lines (ending with a newline) after the given offset and the offset after each of them.
+    # A last line without newline is still being written and left for the next update.
+    with open(file_name, 'rb') as input_file:
+        input_file.seek(offset)
+        data = input_file.read()
+    rows, ends = [], []
+    pos = offset
+    for line in data[:data.rfind(b'\n')+1].splitlines(keepends=True):
+        pos += len(line)
+        if line.strip():
+            rows.append(line.decode())
+            ends.append(pos)
+    return rows, ends
+
+def settings_of(args):
+    # Everything the saved state depends on. The state is only used if these are unchanged.
+    return {'version': STATE_VERSION, 'random_correlation_file': os.path.abspath(args.random_correlation_file),
+        'sqs_correlation_file': os.path.abspath(args.sqs_correlation_file), 'output_file': os.path.abspath(args.output_file_name),
+        'clusters': array_cache.file_hash(args.clusters_file)+array_cache.file_hash(args.structure_file),
+        'damping': args.damping_constant, 'num_best': args.num_best, 'ties': args.ties}
+
+def new_state(settings):
+    return {'settings': settings, 'offsets': {}, 'heads': {}, 'output_size': 0, 'num_sqs': 0,
+        'top_k': [RunningTopK(settings['num_best'], settings['ties']).to_dict() for value in settings['damping']],
+        'written': [None for value in settings['damping']], 'converted': [], 'output_rotated': False}
+
+def is_current(state, settings):
+    # True if the state belongs to the given settings and none of the files has been rewritten since.
+    if state.get('settings') != settings:
+        return False
+    for file_name in [settings['random_correlation_file'], settings['sqs_correlation_file']]:
+        offset = state['offsets'].get(file_name, 0)
+        if not os.path.isfile(file_name) or os.path.getsize(file_name) < offset or head_hash(file_name, offset) != state['heads'].get(file_name, head_hash(file_name, 0)):
+            return False
+    output_file = settings['output_file']
+    return (os.path.getsize(output_file) if os.path.isfile(output_file) else 0) == state['output_size']
+
+def load_state(state_file_name, settings):
+    # The saved state if it is still valid, a new (empty) one otherwise.
+    try:
+        with open(state_file_name, 'r') as state_file:
+            state = json.load(state_file)
+        if is_current(state, settings):
+            return state
+    except (OSError, ValueError, KeyError):
+        pass
+    return new_state(settings)
+
+def save_state(state_file_name, state):
+    # Written to a temporary file first, so an interrupted write leaves the previous state.
+    with open(state_file_name+".tmp", 'w') as state_file:
+        json.dump(state, state_file)
+    os.replace(state_file_name+".tmp", state_file_name)
+
+def update(state, weights):
+    # Scores the rows appended to both correlation files since the last update, appends their errors to the output file
+    # and adds them to the running top-k. Returns the number of new sqs.
+    settings = state['settings']
+    file_names = [settings['random_correlation_file'], settings['sqs_correlation_file']]
+    (rcorr_rows, rcorr_ends), (scorr_rows, scorr_ends) = [complete_rows(file_name, state['offsets'].get(file_name, 0)) for file_name in file_names]
+    num_new = min(len(rcorr_rows), len(scorr_rows))             # mcsqs may have written a row to one of the files only.
+    if num_new == 0:
+        return 0
+    rcorr = np.loadtxt(rcorr_rows[:num_new], ndmin=2)
+    scorr = np.loadtxt(scorr_rows[:num_new], ndmin=2)
+    if rcorr.shape != scorr.shape or rcorr.shape[1] != len(weights):
+        raise ValueError("The correlation files contain different numbers of clusters ({}, {} and {} in the clusters file).".format(rcorr.shape[1], scorr.shape[1], len(weights)))
+    errors = calc_errors(rcorr, scorr, weights)
+
+    with open(settings['output_file'], 'w' if state['output_size'] == 0 else 'a') as output_file:
+        output_file.write(format_errors(errors))
+    state['output_size'] = os.path.getsize(settings['output_file'])
+    for file_name, ends in zip(file_names, [rcorr_ends, scorr_ends]):
+        state['offsets'][file_name] = ends[num_new-1]
+        state['heads'][file_name] = head_hash(file_name, ends[num_new-1])
+    for d in range(len(settings['damping'])):
+        top_k = RunningTopK.from_dict(settings['num_best'], settings['ties'], state['top_k'][d])
+        top_k.add(errors[:, d])
+        state['top_k'][d] = top_k.to_dict()
+    state['num_sqs'] += num_new
+    return num_new
+
+def write_best(sqs_file_name, sqs_index, selected, output_file_name):
+    # Writes the selected sqs found in the sqs file so far, returns their number.
+    available = [number for number in selected if number < len(sqs_index)]
+    with open(output_file_name, 'w') as output_file:
+        for block in read_blocks(sqs_file_name, sqs_index, available):
+            output_file.write(block.text)
+    return len(available)
+
+def convert_new(sqs_file_name, sqs_index, numbers, atom_list, name, representation, output_dir):
+    # Writes the POSCAR files of the given sqs (counted from 0) found in the sqs file so far, returns the numbers converted.
+    # Existing POSCAR files of the same numbers are overwritten.
+    available = [number for number in numbers if number < len(sqs_index)]
+    for number, block in zip(available, read_blocks(sqs_file_name, sqs_index, available)):
+        poscar_dir = os.path.join(output_dir, "poscar_"+str(number+1))
+        os.makedirs(poscar_dir, exist_ok=True)
+        with open(os.path.join(poscar_dir, "POSCAR"), 'w') as output_file:
+            output_file.write(poscar_text(Structure(block.lines, atom_list, number+1), name, number+1, representation))
+    return available
+
+def report(state, num_new):
+    best = ", ".join("{:g}".format(top_k['errors'][0]) for top_k in state['top_k'] if top_k['errors'])
+    print("{} {} new sqs scored, {} in total. Lowest error: {}".format(time.strftime("%H:%M:%S"), num_new, state['num_sqs'], best or "-"))
+    sys.stdout.flush()
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Score only the sqs appended to the files of a running mcsqs job since the last run, keeping the best ones up to date.')
+    parser.add_argument('-r', '--rcorr', dest='random_correlation_file', type=str, default='tcorr_finalRND.out',
+        help='Name of file containing random correlations. Defaults to \'tcorr_finalRND.out\' if omitted.')
+    parser.add_argument('-s', '--scorr', dest='sqs_correlation_file', type=str, default='tcorr_final.out',
+        help='Name of file containing sqs correlations. Defaults to \'tcorr_final.out\' if omitted.')
+    parser.add_argument('-c', '--clus', dest='clusters_file', type=str, default='clusters.out',
+        help='Name of file containing clusters. Defaults to \'clusters.out\' if omitted.')
+    parser.add_argument('-st', '--struc', dest='structure_file', type=str, default='lat.in',
+        help='Name of the structure file (coordinate system in the first three lines). Defaults to \'lat.in\'.')
+    parser.add_argument('-d', '--damp', dest='damping_constant', type=damping_values, default=[2.0],
+        help='Damping constant(s) as for compare_correlations.py, e.g. 2, 1,2,3 or 1:5:0.5 (the errors file then has one column per damping constant, see select_best.py -c). Defaults to 2.')
+    parser.add_argument('-o', '--ofile', dest='output_file_name', type=str, default='errors.out',
+        help='Name of output file the errors of the new sqs are appended to. Defaults to \'errors.out\'.')
+    parser.add_argument('-b', '--best', dest='num_best', type=int, default=10,
+        help='Number of best sqs to keep (written to \'best_sqs.out\', or \'best_sqs_damp[d].out\' for several damping constants). Defaults to 10.')
+    parser.add_argument('-sq', '--sqs', dest='sqs_file', type=str, default='sqs.out',
+        help='File to take the best sqs from. Defaults to \'sqs.out\'.')
+    parser.add_argument('-t', '--ties', dest='ties', action='store_true',
+        help='Additionally keep all sqs with the same error as the last selected one.')
+    parser.add_argument('-k', '--keep-order', dest='keep_order', action='store_true',
+        help='Write the best sqs in the order they appear in the sqs file instead of sorted by error.')
+    parser.add_argument('-p', '--poscar', dest='poscar', action='store_true',
+        help='Convert every new best sqs to a POSCAR file (\'output_files/poscar_[number]/POSCAR\', numbered from 1 as in the sqs file) as soon as it is found.')
+    parser.add_argument('--order', nargs='*', dest='atom_list', default=['Li', 'Nb', 'Ta', 'O'],
+        help='Atom types in desired order for -p (as for atat_poscar.py -o). Defaults to \'Li Nb Ta O\'.')
+    parser.add_argument('-n', '--name', dest='name', type=str, default='Comment (name of structure).',
+        help='Name of structure (first line of the POSCAR files of -p).')
+    parser.add_argument('--repr', dest='representation', type=str, choices=['car', 'cartesian', 'dir', 'direct'], default='cartesian',
+        help='Representation of the atom positions in the POSCAR files of -p. Defaults to cartesian.')
+    parser.add_argument('-S', '--state', dest='state_file', type=str, default=STATE_FILE,
+        help='Name of the file the offsets and best sqs are saved to between runs. Defaults to \'{}\'.'.format(STATE_FILE))
+    parser.add_argument('-w', '--watch', dest='interval', type=float, default=0,
+        help='Check the files again every this many seconds until interrupted (Ctrl-C). A single update if omitted or 0.')
+    timings.add_arguments(parser)
+    args = parser.parse_args(argv)
+    timer = timings.Timings.from_args(args)
+
+    if args.num_best < 1:
+        print("\nThe number of best sqs (-b) has to be at least 1.")
+        sys.exit(-1)
+    for file_name in [args.random_correlation_file, args.sqs_correlation_file, args.structure_file, args.clusters_file]:
+        if not os.path.isfile(file_name):
+            print("\nFile {} not found.".format(file_name))
+            sys.exit(-1)
+
+    weights = cluster_weights(read_clusters(args.clusters_file, args.structure_file), np.array(args.damping_constant, dtype=float))
+    settings = settings_of(args)
+    state = load_state(args.state_file, settings)
+    print("\n{} sqs scored before, continuing from there.".format(state['num_sqs']) if state['num_sqs'] else "\nScoring all sqs.")
+    if args.poscar and not state['output_rotated']:
+        # POSCAR files of an earlier run (e.g. before mcsqs was restarted) would be taken for the current ones, so they are moved aside
+        # once for every new state. The state is saved right away, so later runs continuing from it keep the POSCAR files.
+        messages = poscar_output.rotate(os.path.join(os.getcwd(), OUTPUT_DIR))
+        if messages:
+            print("\n".join(messages))
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        state['output_rotated'] = True
+        save_state(args.state_file, state)
+
+    damping = args.damping_constant
+    try:
+        while True:
+            with timer.stage('update') as stage:
+                try:
+                    num_new = update(state, weights)
+                except ValueError as valerr:
+                    print("\n{}".format(valerr))
+                    sys.exit(-1)
+                stage.items = num_new
+            selections = [RunningTopK.from_dict(args.num_best, args.ties, top_k).result(args.keep_order).tolist() for top_k in state['top_k']]
+            pending = [d for d in range(len(damping)) if selections[d] != state['written'][d] or not os.path.isfile(best_sqs_file_name(d, damping))]
+            unconverted = sorted(set(sum(selections, [])).difference(state['converted'])) if args.poscar else []
+            if (pending or unconverted) and os.path.isfile(args.sqs_file):
+                # Best sqs not found in the sqs file yet (mcsqs writes it after the correlations) are tried again at the next update.
+                with timer.stage('write best') as stage:
+                    sqs_index = load_index(args.sqs_file, tail=False)
+                    for d in pending:
+                        if write_best(args.sqs_file, sqs_index, selections[d], best_sqs_file_name(d, damping)) == len(selections[d]):
+                            state['written'][d] = selections[d]
+                    try:
+                        state['converted'] += convert_new(args.sqs_file, sqs_index, unconverted, args.atom_list, args.name, args.representation, OUTPUT_DIR)
+                    except StructureError as err:
+                        print("\n{}".format(err))
+                        sys.exit(-1)
+                    stage.items = len(pending)+len(unconverted)
+            if num_new or pending or unconverted:
+                save_state(args.state_file, state)
+            if num_new:
+                report(state, num_new)
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopped, {} sqs scored. The state is saved in \'{}\'.".format(state['num_sqs'], args.state_file))
+    timer.finish()
+
+if __name__ == "__main__":
+    main()